@@ -1,8 +1,10 @@
+import threading
+
 import streamlit as st
-import librosa
-import librosa.display
-import numpy as np
-import matplotlib.pyplot as plt
+from cache import ResultCache, audio_hash
+
+# The engine (NumPy, Numba, soundfile, matplotlib) is imported where it is
+# first used, not here, so the page renders without waiting for it
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="VoiceGuard Forensics", page_icon="🕵️‍♂️", layout="wide")
@@ -14,51 +16,69 @@ st.markdown("""
 **Objective:** Differentiate between Human Voice and AI-Generated/Converted Voice.
 """)
 
-# --- THE FORENSIC ENGINE ---
-def analyze_audio_forensics(audio_path):
-    # Load audio (y = audio time series, sr = sampling rate)
-    y, sr = librosa.load(audio_path, sr=None) 
-    
-    ai_score = 0
-    evidence = []
-    
-    # --- TEST 1: FREQUENCY CUTOFF CHECK ---
-    # UPDATED: Lowered threshold to 14kHz to accept standard laptop mics as Human
-    stft = np.abs(librosa.stft(y))
-    energy = np.sum(stft, axis=1)
-    
-    cumulative_energy = np.cumsum(energy)
-    total_energy = cumulative_energy[-1]
-    threshold_idx = np.searchsorted(cumulative_energy, total_energy * 0.99)
-    freqs = librosa.fft_frequencies(sr=sr)
-    cutoff_freq = freqs[threshold_idx]
-    
-    if cutoff_freq < 14000:
-        ai_score += 60 # INCREASED WEIGHT: Strict penalty for low-quality audio
-        evidence.append(f"⚠️ **Hard Frequency Cutoff detected at {int(cutoff_freq)}Hz.** (Likely AI/Low-Quality)")
-    else:
-        evidence.append(f"✅ **Full Frequency Range ({int(cutoff_freq)}Hz).** (Natural)")
-
-    # --- TEST 2: SILENCE PATTERN ANALYSIS ---
-    # UPDATED: Made silence check stricter (needs to be near absolute zero to flag as AI)
-    rms = librosa.feature.rms(y=y)[0]
-    min_silence = np.min(rms)
-    
-    if min_silence < 0.0000001: 
-        ai_score += 40 # INCREASED WEIGHT
-        evidence.append("⚠️ **Unnatural 'Digital Silence' detected.** (Lack of room tone)")
-    else:
-        evidence.append("✅ **Natural Background Noise detected.** (Room tone present)")
-
-    # --- TEST 3: DISPERSION / JITTER ---
-    zero_crossings = librosa.zero_crossings(y, pad=False)
-    zc_variation = np.var(zero_crossings)
-    
-    if zc_variation < 0.02:
-        ai_score += 20
-        evidence.append("⚠️ **Signal is too smooth.** (Lacks organic jitter)")
-    
-    return min(ai_score, 100), evidence, y, sr
+# In-process caches live this long; decoded contexts hold the waveform and
+# its STFT, so only a few are kept
+CACHE_TTL = "1h"
+CONTEXT_CACHE_ENTRIES = 8
+
+# --- RESULT CACHE ---
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+# --- DECODE / FEATURE CACHE ---
+# Reruns only re-execute the script; the content hash of an upload is
+# computed once, and its decoded context (with whatever features have been
+# computed on it) is shared by reruns and sessions. Bytes are not hashed.
+def upload_key(upload):
+    keys = st.session_state.setdefault("upload_keys", {})
+    if upload.file_id not in keys:
+        keys[upload.file_id] = audio_hash(upload.getvalue())
+    return keys[upload.file_id]
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CONTEXT_CACHE_ENTRIES, show_spinner=False)
+def get_context(audio_key, _audio_bytes):
+    from forensics import load_context
+
+    return load_context(_audio_bytes)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=32, show_spinner=False)
+def get_live_verdicts(audio_key, _audio_bytes):
+    from live import detect_recording
+
+    return detect_recording(_audio_bytes)
+
+# Imports and warms the engine once per server process, on a background
+# thread started after the page has been sent, so neither the first page nor
+# the first analysis waits for it
+def _warm_engine():
+    import live, render
+    from forensics import warmup_engine
+
+    warmup_engine()
+    render.colormap_lut()
+
+@st.cache_resource(show_spinner=False)
+def warm_engine():
+    threading.Thread(target=_warm_engine, name="voiceguard-warmup", daemon=True).start()
+
+# --- SPECTROGRAM IMAGE AND TIMELINE CACHE ---
+# Keyed by the audio hash (and the overlay marks) only; the context factory
+# is not hashed and is called (decoding the audio if needed) only when the
+# result is not cached.
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def get_spectrogram_png(audio_key, _get_ctx, marks=()):
+    from render import render_spectrogram_png
+
+    ctx = _get_ctx()
+    with ctx.profile.stage("plot"):
+        return render_spectrogram_png(ctx.magnitude, marks=marks), ctx.sr, len(ctx.y) / ctx.sr
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64, show_spinner=False)
+def get_timeline(audio_key, _get_ctx):
+    from forensics import score_timeline
+
+    return score_timeline(_get_ctx())
 
 # --- USER INTERFACE ---
 col1, col2 = st.columns([1, 2])
@@ -66,23 +86,75 @@ col1, col2 = st.columns([1, 2])
 with col1:
     st.info("Upload your audio sample to run forensic analysis.")
     uploaded_file = st.file_uploader("Upload Audio (.wav or .mp3)", type=["wav", "mp3"])
+    # Block-wise analysis for multi-hour recordings (no spectrogram)
+    streaming = st.toggle("Low-memory streaming mode", help="For very long recordings. Skips the spectrogram.")
+    # Stereo splices can live in one channel only, which a downmix hides
+    per_channel = st.toggle(
+        "Analyze channels separately", disabled=streaming,
+        help="Scores every channel on its own; the verdict is the worst channel's.",
+    ) and not streaming
+
+    # --- LIVE MICROPHONE ---
+    # Sliding-window verdicts, the same detector live.py runs on sockets/pipes
+    with st.expander("🎙️ Live microphone check"):
+        recording = st.audio_input("Record a voice sample")
+        if recording is not None:
+            verdicts = get_live_verdicts(upload_key(recording), recording.getvalue())
+            if verdicts:
+                latest = verdicts[-1]
+                st.line_chart({"AI score": [v["score"] for v in verdicts]}, height=160)
+                st.caption(f"{len(verdicts)} verdicts over {latest['time']:.1f} s, one per 500 ms window step")
+                if latest["verdict"] == "AI":
+                    st.error(f"🚨 Latest window: AI / SYNTHETIC ({latest['score']}%)")
+                else:
+                    st.success(f"✅ Latest window: HUMAN / NATURAL ({100 - latest['score']}%)")
+            else:
+                st.caption("Recording too short for a verdict.")
 
 if uploaded_file is not None:
-    # Save file temporarily
-    with open("temp_file.wav", "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    # Decode from memory; no shared temp file on disk
+    audio_bytes = uploaded_file.getvalue()
     
     # Play Audio
-    st.audio("temp_file.wav")
+    st.audio(audio_bytes, format=uploaded_file.type)
     
     if st.button("🔍 ANALYZE AUDIO SOURCE"):
         with st.spinner("Running Spectral Analysis..."):
-            score, evidence_list, y, sr = analyze_audio_forensics("temp_file.wav")
+            # Re-uploads of the same clip return the stored verdict instantly
+            result_cache = get_result_cache()
+            audio_key = upload_key(uploaded_file)
+            channel_results = None
+            # Per-channel results are not stored; they are opt-in and the
+            # image must show the channel that was flagged
+            cached = None if per_channel else result_cache.get(audio_key)
+            if cached is not None:
+                score, evidence_list = cached
+                ctx = None
+            else:
+                from forensics import analyze_audio_forensics_streaming, analyze_channels, analyze_context
+
+                try:
+                    if streaming:
+                        score, evidence_list, ctx = analyze_audio_forensics_streaming(audio_bytes)
+                    elif per_channel:
+                        score, evidence_list, channel_set = analyze_channels(audio_bytes)
+                        channel_results = channel_set.results
+                        ctx = channel_set.channels[channel_set.worst]
+                    else:
+                        # Features already computed for this upload are reused
+                        score, evidence_list, ctx = analyze_context(get_context(audio_key, audio_bytes))
+                except ValueError as exc:
+                    # An empty recording has nothing to score
+                    st.error(f"Cannot analyze this file: {exc}")
+                    st.stop()
+                if not per_channel:
+                    result_cache.put(audio_key, score, evidence_list)
             
             # --- SHOW VERDICT ---
+            from forensics import verdict_label
+
             st.divider()
-            # If score is high (>50), it's AI. If low, it's Human.
-            if score >= 50: # UPDATED: >= 50 catches the edge cases
+            if verdict_label(score) == "AI":
                 st.error(f"🚨 **VERDICT: AI / SYNTHETIC VOICE** (Confidence: {score}%)")
             else:
                 st.success(f"✅ **VERDICT: HUMAN / NATURAL VOICE** (Confidence: {100-score}%)")
@@ -92,15 +164,61 @@ if uploaded_file is not None:
             
             with c1:
                 st.subheader("📋 Forensic Evidence")
+                if cached is not None:
+                    st.caption("⚡ Cached result for this exact audio.")
                 for item in evidence_list:
                     st.write(item)
+                if channel_results is not None and len(channel_results) > 1:
+                    st.table([
+                        {"channel": c + 1, "AI score (%)": s, "verdict": verdict_label(s)}
+                        for c, (s, _) in enumerate(channel_results)
+                    ])
             
             with c2:
                 st.subheader("📊 Spectrogram Analysis")
-                # Plot Spectrogram
-                fig, ax = plt.subplots(figsize=(10, 4))
-                D = librosa.amplitude_to_db(np.abs(librosa.stft(y)), ref=np.max)
-                img = librosa.display.specshow(D, sr=sr, x_axis='time', y_axis='log', ax=ax)
-                fig.colorbar(img, ax=ax, format="%+2.0f dB")
-                ax.set_title("Frequency Heatmap")
-                st.pyplot(fig)
+                if streaming:
+                    st.info("Spectrogram is not rendered in streaming mode.")
+                else:
+                    # Reuses the magnitude STFT already computed for Test 1; a
+                    # result-cache hit decodes only if neither the image nor
+                    # the context is still cached
+                    image_key = f"{audio_key}/channel{channel_set.worst}" if per_channel else audio_key
+                    get_ctx = lambda: ctx or get_context(audio_key, audio_bytes)
+                    # Windows scored as AI are tinted red on the image
+                    timeline = get_timeline(image_key, get_ctx)
+                    end = timeline["end"][-1]
+                    marks = tuple((t0 / end, t1 / end) for t0, t1 in timeline["flagged"]) if end > 0 else ()
+                    png, sr, duration = get_spectrogram_png(image_key, get_ctx, marks)
+                    st.image(png, width="stretch")
+                    channel = f"Channel {channel_set.worst + 1} " if per_channel else ""
+                    st.caption(f"{channel}Frequency Heatmap: 0–{duration:.1f} s, log frequency up to {sr // 2} Hz, 80 dB range")
+                    if len(timeline["scores"]) > 1:
+                        st.line_chart(
+                            {"time (s)": timeline["start"], "AI score": timeline["scores"]},
+                            x="time (s)", y="AI score", height=160,
+                        )
+                    if timeline["flagged"]:
+                        ranges = ", ".join(f"{t0:.1f}–{t1:.1f} s" for t0, t1 in timeline["flagged"])
+                        st.caption(f"🚩 Windows scored AI ({timeline['window_seconds']:.0f} s windows): {ranges}")
+            
+            # --- PERFORMANCE ---
+            with st.expander("⏱️ Performance"):
+                if ctx is None:
+                    st.caption("Served from the result cache; no stages ran.")
+                else:
+                    profile = ctx.profile.as_dict()
+                    st.caption(f"Total: {profile['total_seconds'] * 1000:.1f} ms")
+                    st.table([
+                        {
+                            "stage": name,
+                            "time (ms)": round(entry["seconds"] * 1000, 1),
+                            "calls": entry["calls"],
+                            "RSS Δ (MB)": round(entry["rss_delta_mb"], 1),
+                            # Only present when VOICEGUARD_TRACE_MEMORY=1
+                            "alloc peak (MB)": round(entry["alloc_peak_mb"], 1) if "alloc_peak_mb" in entry else None,
+                        }
+                        for name, entry in profile["stages"].items()
+                    ])
+
+# Last, so everything above is already on its way to the browser
+warm_engine()
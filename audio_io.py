@@ -0,0 +1,264 @@
+import io
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# --- IN-MEMORY SOURCES ---
+# Uploads are decoded straight from memory. bytes, bytearray and memoryview
+# are wrapped in a reader over a memoryview of the caller's buffer, whose
+# readinto() copies directly into libsndfile's buffer and whose view the
+# WAV fast path reads in place, so the upload is never duplicated. (An
+# io.BytesIO would copy on getbuffer(), which unshares its bytes.)
+class MemoryReader(io.RawIOBase):
+    def __init__(self, data, name=""):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        memoryview(b).cast("B")[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+def open_source(source, name=""):
+    # Paths and file-like objects pass through; raw bytes get a reader
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return MemoryReader(source, name)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+# --- PATH FALLBACK ---
+# Some codecs (e.g. MP3 on an older libsndfile) only decode through
+# audioread, which needs a real file. Only then is the buffer spooled to a
+# unique temp file, so concurrent sessions never share one.
+@contextmanager
+def decodable(source, name=""):
+    source = open_source(source, name)
+    if is_path(source):
+        yield source
+        return
+
+    try:
+        sf.info(source)
+        native = True
+    except sf.LibsndfileError:
+        native = False
+    source.seek(0)
+    if native:
+        yield source
+        return
+
+    suffix = os.path.splitext(getattr(source, "name", "") or name)[1]
+    fd, path = tempfile.mkstemp(prefix="voiceguard-", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := source.read(1 << 20):
+                f.write(chunk)
+        yield path
+    finally:
+        os.unlink(path)
+
+# --- FAST DECODE ---
+# PCM WAV is most of the traffic. Its samples are read straight out of the
+# upload buffer (or a read-only mapping of the file) and converted to float32
+# mono in one vectorized pass; anything else libsndfile understands goes
+# through soundfile, and librosa.load is the last resort. Output matches
+# librosa.load(source, sr=None).
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits per sample) -> (sample dtype, scale to [-1, 1))
+WAV_SAMPLE_TYPES = {
+    (WAVE_FORMAT_PCM, 16): ("<i2", 1 / 32768),
+    (WAVE_FORMAT_PCM, 32): ("<i4", 1 / 2147483648),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): ("<f4", 1.0),
+}
+
+def parse_wav_header(raw):
+    # Returns (format tag, channels, sr, bits, data offset, data size) or None
+    if len(raw) < 12 or bytes(raw[0:4]) != b"RIFF" or bytes(raw[8:12]) != b"WAVE":
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(raw):
+        chunk_id = bytes(raw[pos:pos + 4])
+        (size,) = struct.unpack_from("<I", raw, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt " and size >= 16:
+            # A truncated header is left to soundfile, which reports it
+            if body + 16 > len(raw):
+                return None
+            tag, channels, sr, _, _, bits = struct.unpack_from("<HHIIHH", raw, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 40 and body + 26 <= len(raw):
+                # The real format tag leads the SubFormat GUID
+                (tag,) = struct.unpack_from("<H", raw, body + 24)
+            fmt = (tag, channels, sr, bits)
+        elif chunk_id == b"data" and fmt is not None:
+            # Streamed WAVs may leave the size unset; trust the real length
+            size = min(size, len(raw) - body)
+            return (*fmt, body, size)
+        pos = body + size + (size & 1)
+    return None
+
+def map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapping, "madvise"):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+    return mapping
+
+def _byte_view(source):
+    if is_path(source):
+        return map_file(source)
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    if isinstance(source, MemoryReader):
+        return source._view
+    return None
+
+def pcm_to_mono(data, scale):
+    # data is (frames, channels); one pass, one float32 output array
+    channels = data.shape[1]
+    if channels == 1:
+        return np.multiply(data[:, 0], scale, dtype=np.float32)
+    y = np.add.reduce(data, axis=1, dtype=np.float32)
+    y *= np.float32(scale / channels)
+    return y
+
+def pcm_to_channels(data, scale):
+    # (frames, channels) -> float32 (channels, frames), one pass
+    y = np.empty(data.shape[::-1], dtype=np.float32)
+    np.multiply(data.T, scale, out=y)
+    return y
+
+class WavSamples(NamedTuple):
+    data: np.ndarray  # frames x channels view of the raw samples
+    scale: float
+    sr: int
+    raw: object  # backing buffer (mmap or upload memoryview)
+    offset: int  # byte offset of the payload in raw
+
+def wav_samples(source):
+    # None when the source is not a WAV this reader handles
+    raw = _byte_view(source)
+    if raw is None:
+        return None
+    header = parse_wav_header(raw)
+    if header is None:
+        return None
+    tag, channels, sr, bits, offset, size = header
+    sample_type = WAV_SAMPLE_TYPES.get((tag, bits))
+    if sample_type is None or channels == 0:
+        return None
+
+    dtype, scale = sample_type
+    frames = size // (np.dtype(dtype).itemsize * channels)
+    data = np.frombuffer(raw, dtype=dtype, count=frames * channels, offset=offset).reshape(frames, channels)
+    return WavSamples(data, scale, sr, raw, offset)
+
+def read_wav(source):
+    samples = wav_samples(source)
+    if samples is None:
+        return None
+    return pcm_to_mono(samples.data, samples.scale), samples.sr
+
+def load_audio(source):
+    # (y, sr) as float32 mono at the native rate
+    fast = read_wav(source)
+    if fast is not None:
+        return fast
+    try:
+        data, sr = sf.read(source, dtype="float32", always_2d=True)
+        return (data[:, 0] if data.shape[1] == 1 else pcm_to_mono(data, 1.0)), sr
+    except sf.LibsndfileError:
+        if not is_path(source):
+            raise
+    return librosa.load(source, sr=None)
+
+def load_channels(source):
+    # (y, sr) with y float32 (channels, samples), no downmix; a mono file
+    # gives one row equal to load_audio's output
+    samples = wav_samples(source)
+    if samples is not None:
+        return pcm_to_channels(samples.data, samples.scale), samples.sr
+    try:
+        data, sr = sf.read(source, dtype="float32", always_2d=True)
+        return pcm_to_channels(data, 1.0), sr
+    except sf.LibsndfileError:
+        if not is_path(source):
+            raise
+    y, sr = librosa.load(source, sr=None, mono=False)
+    return np.atleast_2d(y), sr
+
+# --- BLOCK INGESTION ---
+# Float32 mono blocks for the streaming engine. WAV payloads are read from
+# the mapping block by block: pages fault in on demand and are dropped once
+# converted, so resident memory stays at about one block even for files
+# larger than physical RAM. Other formats stream through soundfile.
+def _release_pages(mapping, start, end):
+    start -= start % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if end > start:
+        mapping.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+def _mapped_blocks(samples, block_size):
+    data = samples.data
+    release = isinstance(samples.raw, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED")
+    released = 0
+    for start in range(0, len(data), block_size):
+        stop = min(start + block_size, len(data))
+        block = pcm_to_mono(data[start:stop], samples.scale)
+        if release:
+            consumed = samples.offset + stop * data.strides[0]
+            _release_pages(samples.raw, released, consumed)
+            released = consumed - consumed % mmap.PAGESIZE
+        yield block
+
+def _soundfile_blocks(f, block_size):
+    for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+        yield block[:, 0] if block.shape[1] == 1 else pcm_to_mono(block, 1.0)
+
+@contextmanager
+def open_blocks(source, block_size):
+    # Yields (sr, iterator of float32 mono blocks)
+    samples = wav_samples(source)
+    if samples is not None:
+        yield samples.sr, _mapped_blocks(samples, block_size)
+        return
+    with sf.SoundFile(source) as f:
+        yield f.samplerate, _soundfile_blocks(f, block_size)
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from forensics import CUTOFF_STRIDE, TIMELINE_HOP_SECONDS, analyze, init_worker
+from instrumentation import METRICS, record_analysis
+from spectral import BACKEND_CHOICES, FFT_BACKEND, FFT_WORKERS
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac")
+CSV_FIELDS = ["path", "score", "verdict", "evidence", "seconds", "error"]
+
+# --- INPUT DISCOVERY ---
+def iter_audio_paths(inputs, manifest=None):
+    sources = list(inputs)
+    if manifest:
+        with open(manifest, encoding="utf-8") as f:
+            sources.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    seen = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(source)
+                for name in names
+                if name.lower().endswith(AUDIO_EXTENSIONS)
+            )
+        elif glob.has_magic(source):
+            matches = sorted(glob.glob(source, recursive=True))
+        else:
+            matches = [source]
+
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+# --- WORKER ---
+def analyze_file(path, **options):
+    # Runs in a pool worker; only plain data crosses the process boundary
+    try:
+        result = analyze(path, **options)
+    except Exception as exc:
+        return {
+            "path": path, "score": None, "verdict": None, "evidence": [], "timings": None,
+            "error": f"{type(exc).__name__}: {exc}",
+        }
+    return {"path": path, **result, "error": None}
+
+# --- OUTPUT ---
+def write_results(results, out, fmt):
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in results:
+            seconds = row["timings"]["total_seconds"] if row["timings"] else None
+            writer.writerow({
+                **{k: v for k, v in row.items() if k in CSV_FIELDS},
+                "evidence": " | ".join(row["evidence"]),
+                "seconds": seconds,
+            })
+            yield row
+    else:
+        for row in results:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            yield row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VoiceGuard headless batch triage.")
+    parser.add_argument("inputs", nargs="*", help="Audio files, directories or glob patterns")
+    parser.add_argument("-m", "--manifest", help="Text file with one path, directory or glob per line")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--chunksize", type=int, default=8, help="Files handed to a worker at a time")
+    engine = parser.add_mutually_exclusive_group()
+    engine.add_argument("--streaming", action="store_true", help="Use the low-memory streaming engine")
+    engine.add_argument(
+        "--fast", action="store_true",
+        help="Stop once the verdict is decided; scores become lower bounds and evidence may be partial",
+    )
+    parser.add_argument(
+        "--cutoff-stride", type=int, default=CUTOFF_STRIDE, metavar="N",
+        help="Estimate the cutoff from every Nth frame, computing it exactly only near the threshold (1: exact)",
+    )
+    parser.add_argument(
+        "--channels", action="store_true",
+        help="Score every channel separately instead of the mono downmix; the file gets the worst channel's verdict",
+    )
+    parser.add_argument(
+        "--timeline", action="store_true",
+        help=f"Add per-window scores ({TIMELINE_HOP_SECONDS:g} s hops) and flagged time ranges to JSONL rows",
+    )
+    parser.add_argument("--metrics", help="Write Prometheus text-format metrics here when done")
+    parser.add_argument("--fft-backend", choices=BACKEND_CHOICES, default=FFT_BACKEND)
+    parser.add_argument("--fft-workers", type=int, default=FFT_WORKERS, help="Threads per FFT (-1: all cores)")
+    args = parser.parse_args(argv)
+
+    if not args.inputs and not args.manifest:
+        parser.error("provide at least one input or --manifest")
+
+    paths = list(iter_audio_paths(args.inputs, args.manifest))
+    if args.cutoff_stride < 1:
+        parser.error("--cutoff-stride must be at least 1")
+    if args.streaming and (args.channels or args.timeline):
+        parser.error("--channels and --timeline need the in-memory engine")
+    worker = partial(
+        analyze_file, streaming=args.streaming, fast=args.fast, cutoff_stride=args.cutoff_stride,
+        channels=args.channels, timeline=args.timeline,
+    )
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    try:
+        # Warmed once here, before the pool forks, so every worker inherits
+        # the compiled kernels and FFT setup instead of redoing them
+        init_worker(args.fft_backend, args.fft_workers)
+        with ProcessPoolExecutor(
+            max_workers=args.workers, initializer=init_worker, initargs=(args.fft_backend, args.fft_workers),
+        ) as pool:
+            results = pool.map(worker, paths, chunksize=args.chunksize)
+            for row in write_results(results, out, args.format):
+                if row["error"] is not None:
+                    failures += 1
+                    METRICS.inc("voiceguard_analysis_errors_total")
+                else:
+                    record_analysis(row["timings"], row["verdict"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(METRICS.render())
+
+    print(f"Analyzed {len(paths)} files ({failures} failed).", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
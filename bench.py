@@ -0,0 +1,536 @@
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+SIGNALS = ["tone", "noise", "speech", "padded"]
+SAMPLE_RATES = [8000, 16000, 22050, 44100, 48000]
+DURATIONS = [1, 10, 60]
+FULL_DURATIONS = [1, 10, 60, 600, 3600]
+CODECS = {"wav": ("WAV", "PCM_16"), "flac": ("FLAC", "PCM_16"), "mp3": ("MP3", "MPEG_LAYER_III")}
+MODES = ["memory", "streaming", "fast"]
+DEFAULT_MODES = ["memory", "streaming"]
+REGRESSION_RATIO = 1.2
+
+# --- SIGNAL SYNTHESIS ---
+# Deterministic test signals, generated in one-minute pieces so hour-long
+# clips never need the whole waveform in memory.
+def synthesize(kind, sr, duration, seed=0):
+    rng = np.random.default_rng(seed)
+    step = sr * 60
+    n = int(sr * duration)
+    for start in range(0, n, step):
+        t = np.arange(start, min(start + step, n)) / sr
+        if kind == "tone":
+            y = 0.3 * np.sin(2 * np.pi * 440 * t)
+        elif kind == "noise":
+            y = 0.1 * rng.standard_normal(len(t))
+        elif kind == "speech":
+            # Harmonic carrier with a ~4 Hz syllabic envelope plus room noise
+            f0 = 140 + 20 * np.sin(2 * np.pi * 0.3 * t)
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            carrier = sum(np.sin(k * phase) / k for k in range(1, 8))
+            envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+            y = 0.2 * envelope * carrier + 0.002 * rng.standard_normal(len(t))
+        elif kind == "padded":
+            # Noise burst framed by exact digital silence
+            y = 0.1 * rng.standard_normal(len(t))
+            y[(t % 10) < 2] = 0.0
+        else:
+            raise ValueError(f"unknown signal {kind!r}")
+        yield y.astype(np.float32)
+
+def write_clip(directory, kind, sr, duration, codec):
+    fmt, subtype = CODECS[codec]
+    path = os.path.join(directory, f"{kind}_{sr}_{duration}s.{codec}")
+    if not os.path.exists(path):
+        with sf.SoundFile(path, "w", samplerate=sr, channels=1, format=fmt, subtype=subtype) as f:
+            for piece in synthesize(kind, sr, duration):
+                f.write(piece)
+    return path
+
+# --- MEASUREMENT ---
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _stage_seconds(profile):
+    return {name: entry["seconds"] for name, entry in profile.stages.items()}
+
+# Stage timings come from the engine's own StageProfile
+def _memory_stages(path, plot, fast=False):
+    from forensics import analyze_audio_forensics
+
+    score, _, ctx = analyze_audio_forensics(path, fast)
+    if plot:
+        with ctx.profile.stage("plot"):
+            _render_png(ctx)
+    return score, _stage_seconds(ctx.profile)
+
+def _render_png(ctx):
+    from render import render_spectrogram_png
+
+    render_spectrogram_png(ctx.magnitude)
+
+# The full-resolution figure the UI drew before render.py, for comparison
+def _render_matplotlib(ctx):
+    import librosa
+    import librosa.display
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    D = librosa.amplitude_to_db(ctx.magnitude, ref=np.max)
+    img = librosa.display.specshow(D, sr=ctx.sr, x_axis='time', y_axis='log', ax=ax)
+    fig.colorbar(img, ax=ax, format="%+2.0f dB")
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+def _streaming_stages(path):
+    from forensics import analyze_audio_forensics_streaming
+
+    score, _, acc = analyze_audio_forensics_streaming(path)
+    return score, _stage_seconds(acc.profile)
+
+def _decode_stages(path, loader):
+    import librosa
+    from audio_io import load_audio
+
+    start = time.perf_counter()
+    if loader == "librosa":
+        librosa.load(path, sr=None)
+    else:
+        load_audio(path)
+    return None, {"decode": time.perf_counter() - start}
+
+def _render_stages(path, renderer):
+    from forensics import load_context
+
+    ctx = load_context(path)
+    ctx.magnitude
+    start = time.perf_counter()
+    renderer(ctx)
+    return None, {"plot": time.perf_counter() - start}
+
+# librosa.stft against each spectral backend, on already decoded audio
+def _fft_stages(path, backend):
+    import librosa
+    from audio_io import load_audio
+    from forensics import HOP_LENGTH, N_FFT
+    from spectral import make_backend, stft_magnitude
+
+    y, _ = load_audio(path)
+    start = time.perf_counter()
+    if backend == "librosa":
+        np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    else:
+        stft_magnitude(y, N_FFT, HOP_LENGTH, backend=make_backend(backend))
+    return None, {"stft": time.perf_counter() - start}
+
+RUNNERS = {
+    "memory": lambda case: _memory_stages(case["path"], case["plot"]),
+    # Early-exit triage; a spectrogram would need the STFT it skips
+    "fast": lambda case: _memory_stages(case["path"], False, fast=True),
+    "streaming": lambda case: _streaming_stages(case["path"]),
+    "decode-librosa": lambda case: _decode_stages(case["path"], "librosa"),
+    "decode-fast": lambda case: _decode_stages(case["path"], "fast"),
+    "render-matplotlib": lambda case: _render_stages(case["path"], _render_matplotlib),
+    "render-png": lambda case: _render_stages(case["path"], _render_png),
+    "fft-librosa": lambda case: _fft_stages(case["path"], "librosa"),
+    "fft-numpy": lambda case: _fft_stages(case["path"], "numpy"),
+    "fft-scipy": lambda case: _fft_stages(case["path"], "scipy"),
+    "fft-pyfftw": lambda case: _fft_stages(case["path"], "pyfftw"),
+}
+
+def _run_once(case):
+    start = time.perf_counter()
+    score, stages = RUNNERS[case["mode"]](case)
+    return time.perf_counter() - start, stages, score
+
+def run_case(case):
+    # Executed in a fresh process so peak RSS belongs to this case alone.
+    # The first run pays imports and JIT compilation and is reported as
+    # cold_s; wall_s and the stage breakdown are the best warm run.
+    cold, _, _ = _run_once(case)
+    best = None
+    for _ in range(case["repeat"]):
+        wall, stages, score = _run_once(case)
+        if best is None or wall < best["wall_s"]:
+            best = {"wall_s": wall, "cold_s": cold, "stages_s": stages, "score": None if score is None else int(score)}
+    best["peak_rss_mb"] = peak_rss_mb()
+    return best
+
+def _isolated(fn, arg):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, arg).result()
+
+# --- SUITES ---
+def _sweep(args, workdir, suite, modes, signals):
+    results = []
+    for codec in args.codecs:
+        for sr in args.rates:
+            for duration in args.durations:
+                for kind in signals:
+                    path = write_clip(workdir, kind, sr, duration, codec)
+                    for mode in modes:
+                        case_id = f"{suite}/{mode}/{codec}/{kind}/{sr}/{duration}s"
+                        case = {"path": path, "mode": mode, "plot": args.plot, "repeat": args.repeat}
+                        result = _isolated(run_case, case)
+                        result["case"] = case_id
+                        results.append(result)
+                        _report(result)
+    return results
+
+def bench_engine(args, workdir):
+    return _sweep(args, workdir, "engine", args.modes, args.signals)
+
+def bench_decode(args, workdir):
+    # Generic librosa.load against the dedicated reader in audio_io
+    return _sweep(args, workdir, "decode", ["decode-librosa", "decode-fast"], ["noise"])
+
+def bench_render(args, workdir):
+    return _sweep(args, workdir, "render", ["render-matplotlib", "render-png"], ["speech"])
+
+def bench_fft(args, workdir):
+    modes = ["fft-librosa", "fft-numpy", "fft-scipy"]
+    if importlib.util.find_spec("pyfftw") is not None:
+        modes.append("fft-pyfftw")
+    return _sweep(args, workdir, "fft", modes, ["noise"])
+
+# Streaming and live engines at small blocks, Numba kernels against NumPy
+KERNEL_BLOCK_FRAMES = [1, 4, 16, 64, 256]
+
+def _kernel_stages(case):
+    # Kernels are chosen at import, and each case runs in a fresh process
+    os.environ["VOICEGUARD_NUMBA"] = "1" if case["numba"] else "0"
+    from forensics import HOP_LENGTH, analyze_audio_forensics_streaming
+    from kernels import warmup
+    from live import detect_recording
+
+    warmup()
+    start = time.perf_counter()
+    if case["engine"] == "live":
+        detect_recording(case["path"], block_size=case["block_frames"] * HOP_LENGTH)
+        return None, {"live": time.perf_counter() - start}
+    score, _, acc = analyze_audio_forensics_streaming(case["path"], block_frames=case["block_frames"])
+    return score, _stage_seconds(acc.profile)
+
+RUNNERS["kernels"] = _kernel_stages
+
+def bench_kernels(args, workdir):
+    variants = [False]
+    if importlib.util.find_spec("numba") is not None:
+        variants.append(True)
+    results = []
+    for sr in args.rates:
+        for duration in args.durations:
+            path = write_clip(workdir, "speech", sr, duration, "wav")
+            for engine in ("streaming", "live"):
+                for block_frames in KERNEL_BLOCK_FRAMES:
+                    for numba in variants:
+                        case_id = f"kernels/{engine}/{'numba' if numba else 'numpy'}/{sr}/{duration}s/{block_frames}f"
+                        case = {
+                            "path": path, "mode": "kernels", "engine": engine, "block_frames": block_frames,
+                            "numba": numba, "repeat": args.repeat,
+                        }
+                        result = _isolated(run_case, case)
+                        result["case"] = case_id
+                        results.append(result)
+                        _report(result)
+    return results
+
+# Strided cutoff pre-screen against the exact cutoff. Signals are low-passed
+# around the 14 kHz threshold, where the estimate is least certain.
+PRESCREEN_STRIDES = [2, 4, 8, 16, 32]
+PRESCREEN_LOWPASS_HZ = [8000, 12000, 13500, 14000, 14500, 16000, None]
+
+def _timed_cutoff(y, sr, stride, repeat):
+    from forensics import SpectralContext, cutoff_test
+
+    timings = []
+    for _ in range(repeat + 1):
+        ctx = SpectralContext(y, sr)
+        start = time.perf_counter()
+        cutoff_freq, estimated = cutoff_test(ctx, stride)
+        timings.append(time.perf_counter() - start)
+    return cutoff_freq, estimated, timings[0], min(timings[1:]), _stage_seconds(ctx.profile)
+
+def bench_prescreen(args, workdir):
+    from scipy import signal
+    from forensics import CUTOFF_HZ
+
+    results = []
+    summary = {stride: [0, 0, 0, 0.0] for stride in PRESCREEN_STRIDES}
+    for sr in args.rates:
+        for duration in args.durations:
+            for kind in args.signals:
+                clean = np.concatenate(list(synthesize(kind, sr, duration)))
+                for lowpass in PRESCREEN_LOWPASS_HZ:
+                    y = clean
+                    if lowpass is not None and lowpass < sr / 2:
+                        sos = signal.butter(12, lowpass, fs=sr, output="sos")
+                        y = signal.sosfilt(sos, clean).astype(np.float32)
+                    exact, _, _, exact_s, _ = _timed_cutoff(y, sr, 1, args.repeat)
+                    for stride in PRESCREEN_STRIDES:
+                        cutoff_freq, estimated, cold, wall, stages = _timed_cutoff(y, sr, stride, args.repeat)
+                        agree = (cutoff_freq < CUTOFF_HZ) == (exact < CUTOFF_HZ)
+                        result = {
+                            "case": f"prescreen/{kind}/{sr}/{duration}s/lp{lowpass or 'none'}/x{stride}",
+                            "wall_s": wall, "cold_s": cold, "stages_s": stages, "peak_rss_mb": peak_rss_mb(),
+                            "score": int(cutoff_freq < CUTOFF_HZ), "exact_hz": float(exact),
+                            "estimate_hz": float(cutoff_freq), "escalated": not estimated, "speedup": exact_s / wall,
+                        }
+                        results.append(result)
+                        _report(result)
+                        entry = summary[stride]
+                        entry[0] += 1
+                        entry[1] += agree
+                        entry[2] += not estimated
+                        entry[3] += exact_s / wall
+
+    print("\nstride  agreement  escalated  mean speedup")
+    for stride, (n, agreed, escalated, speedup) in summary.items():
+        if n:
+            print(f"x{stride:<6} {agreed:>4}/{n:<5} {escalated:>5}/{n:<5} {speedup / n:9.2f}x")
+    return results
+
+# Cold start of the UI, each sample in a fresh process: time from launching
+# `streamlit run app.py` to the first byte of the page, the first script
+# run (what the browser waits for after connecting), and importing the
+# analysis engine that the page defers.
+STARTUP_TIMEOUT_S = 60
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+_FIRST_RENDER = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+start = time.perf_counter()
+app.run()
+print(time.perf_counter() - start)
+"""
+
+_ENGINE_IMPORT = """
+import time
+start = time.perf_counter()
+import forensics, live, render
+print(time.perf_counter() - start)
+"""
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _server_first_byte():
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless=true",
+        f"--server.port={port}", "--browser.gatherUsageStats=false",
+    ]
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    response.read(1)
+                    return time.perf_counter() - start
+            except OSError:
+                if proc.poll() is not None or time.perf_counter() - start > STARTUP_TIMEOUT_S:
+                    raise RuntimeError("streamlit server did not come up")
+                time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def _timed_script(source, *argv):
+    out = subprocess.run(
+        [sys.executable, "-c", source, *argv], cwd=os.path.dirname(APP_PATH),
+        capture_output=True, text=True, check=True, timeout=STARTUP_TIMEOUT_S,
+    ).stdout
+    return float(out.split()[-1])
+
+STARTUP_PROBES = {
+    "server-ttfb": _server_first_byte,
+    "first-render": lambda: _timed_script(_FIRST_RENDER, APP_PATH),
+    "engine-import": lambda: _timed_script(_ENGINE_IMPORT),
+}
+
+def bench_startup(args, workdir):
+    results = []
+    for name, probe in STARTUP_PROBES.items():
+        cold = probe()
+        wall = min(probe() for _ in range(args.repeat))
+        result = {
+            "case": f"startup/{name}", "wall_s": wall, "cold_s": cold, "stages_s": {name: wall},
+            "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN), "score": None,
+        }
+        results.append(result)
+        _report(result)
+    return results
+
+# The silence test on a decimated copy against the native rate: time of its
+# features (resample + frames) and agreement of its flag.
+DECIMATION_NATIVE_SR = [44100, 48000, 96000]
+DECIMATION_TARGETS = [8000, 16000, 22050]
+
+def _timed_frame_features(y, sr, target, repeat):
+    from forensics import SpectralContext
+
+    timings = []
+    for _ in range(repeat + 1):
+        ctx = SpectralContext(y, sr)
+        start = time.perf_counter()
+        ctx.frame_features_at(target)
+        timings.append(time.perf_counter() - start)
+    return timings[0], min(timings[1:]), _stage_seconds(ctx.profile)
+
+def _frame_flags(y, sr, target):
+    # Weight of the flagged decimated tests, i.e. their share of the score
+    from forensics import DECIMATED_TESTS, DETECTORS, SpectralContext, run_detectors
+
+    detectors = [d for d in DETECTORS if d.name in DECIMATED_TESTS]
+    values = run_detectors(SpectralContext(y, sr), detectors, analysis_sr=dict.fromkeys(DECIMATED_TESTS, target))
+    return sum(d.weight for d in detectors if d.judge(values[d.name])[0])
+
+def bench_decimate(args, workdir):
+    results = []
+    summary = {target: [0, 0, 0.0] for target in DECIMATION_TARGETS}
+    for sr in DECIMATION_NATIVE_SR:
+        for duration in args.durations:
+            for kind in args.signals:
+                y = np.concatenate(list(synthesize(kind, sr, duration)))
+                _, native_s, _ = _timed_frame_features(y, sr, None, args.repeat)
+                native_flags = _frame_flags(y, sr, None)
+                for target in DECIMATION_TARGETS:
+                    cold, wall, stages = _timed_frame_features(y, sr, target, args.repeat)
+                    flags = _frame_flags(y, sr, target)
+                    result = {
+                        "case": f"decimate/{kind}/{sr}/{duration}s/{target}",
+                        "wall_s": wall, "cold_s": cold, "stages_s": stages, "peak_rss_mb": peak_rss_mb(),
+                        "score": flags, "native_score": native_flags, "speedup": native_s / wall,
+                    }
+                    results.append(result)
+                    _report(result)
+                    entry = summary[target]
+                    entry[0] += 1
+                    entry[1] += flags == native_flags
+                    entry[2] += native_s / wall
+
+    print("\ntarget  agreement  mean speedup")
+    for target, (n, agreed, speedup) in summary.items():
+        if n:
+            print(f"{target:<7} {agreed:>4}/{n:<5} {speedup / n:9.2f}x")
+    return results
+
+SUITES = {
+    "engine": bench_engine, "decode": bench_decode, "render": bench_render, "fft": bench_fft,
+    "kernels": bench_kernels, "prescreen": bench_prescreen, "startup": bench_startup,
+    "decimate": bench_decimate,
+}
+
+# --- REPORTING ---
+def _report(result):
+    stages = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in result["stages_s"].items())
+    print(
+        f"{result['case']:<48} {result['wall_s'] * 1000:9.1f}ms (cold {result['cold_s'] * 1000:7.1f}ms)"
+        f" {result['peak_rss_mb']:8.1f}MB  {stages}",
+        flush=True,
+    )
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, ratio):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["case"]: r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\nComparison against {baseline_path} (regression > {ratio:.2f}x):")
+    for result in results:
+        old = baseline.get(result["case"])
+        if old is None:
+            continue
+        speed = result["wall_s"] / old["wall_s"]
+        memory = result["peak_rss_mb"] / old["peak_rss_mb"]
+        flag = ""
+        if speed > ratio or memory > ratio:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        if result.get("score") != old.get("score"):
+            flag += "  <-- VERDICT CHANGED"
+            regressions += 1
+        print(f"{result['case']:<48} time x{speed:5.2f}  rss x{memory:5.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VoiceGuard forensic engine benchmarks.")
+    parser.add_argument("--suite", nargs="+", choices=sorted(SUITES), default=["engine"])
+    parser.add_argument("--signals", nargs="+", choices=SIGNALS, default=SIGNALS)
+    parser.add_argument("--rates", nargs="+", type=int, default=SAMPLE_RATES)
+    parser.add_argument("--durations", nargs="+", type=float, default=DURATIONS, help="Clip lengths in seconds")
+    parser.add_argument("--full", action="store_true", help="Durations from 1 s up to 1 h")
+    parser.add_argument("--codecs", nargs="+", choices=sorted(CODECS), default=["wav"])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=DEFAULT_MODES)
+    parser.add_argument("--no-plot", dest="plot", action="store_false", help="Skip the spectrogram stage")
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per case; the fastest is kept")
+    parser.add_argument("--workdir", help="Where synthesized clips are kept (default: a temp dir)")
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare against a saved JSON baseline")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO, help="Slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    if args.full:
+        args.durations = FULL_DURATIONS
+    args.durations = [int(d) if float(d).is_integer() else d for d in args.durations]
+
+    with tempfile.TemporaryDirectory(prefix="voiceguard-bench-") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        results = []
+        for suite in args.suite:
+            results.extend(SUITES[suite](args, workdir))
+
+    if args.save:
+        payload = {
+            "meta": {
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.ratio) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "VOICEGUARD_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "voiceguard", "results.sqlite"),
+)
+DEFAULT_MAX_ENTRIES = 10000
+
+def audio_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+# --- RESULT CACHE ---
+# Persistent score/evidence store keyed by the SHA-256 of the uploaded bytes.
+# Rows carry the detector version they were computed with; rows from any
+# other version are dropped on open, and the least recently used rows are
+# evicted once the table grows past max_entries.
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        if version is None:
+            # Deferred: hashing uploads must not load the analysis engine
+            from forensics import detector_version
+            version = detector_version()
+        self.version = version
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " version TEXT NOT NULL,"
+                " score INTEGER NOT NULL,"
+                " evidence TEXT NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_access)")
+            conn.execute("DELETE FROM results WHERE version != ?", (self.version,))
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across the
+        # threads Streamlit reruns on and across processes
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT score, evidence FROM results WHERE key = ? AND version = ?",
+                (key, self.version),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, key, score, evidence):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, version, score, evidence, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, self.version, int(score), json.dumps(evidence, ensure_ascii=False), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
@@ -0,0 +1,793 @@
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_io import decodable, load_audio, load_channels, open_blocks
+from instrumentation import StageProfile
+from kernels import add_frame_sums, crossing_count, min_frame_rms, warmup
+from spectral import FFT_BACKEND, FFT_WORKERS, set_backend, stft_magnitude
+
+# STFT / framing parameters (librosa defaults, spelled out so the streaming
+# path frames the signal exactly like the in-memory path)
+N_FFT = 2048
+HOP_LENGTH = 512
+ZC_THRESHOLD = 1e-10
+
+# Detection thresholds and weights
+CUTOFF_ENERGY_RATIO = 0.99
+CUTOFF_HZ = 14000
+CUTOFF_WEIGHT = 60
+SILENCE_RMS = 0.0000001
+SILENCE_WEIGHT = 40
+ZC_VARIATION = 0.02
+ZC_WEIGHT = 20
+
+# Scores at or above this are reported as AI / synthetic
+VERDICT_THRESHOLD = 50
+
+# Cutoff pre-screen: every Nth STFT frame is transformed and the estimate is
+# trusted only when it clears the threshold by PRESCREEN_Z standard errors.
+# A stride of 1 always computes the exact cutoff.
+CUTOFF_STRIDE = 1
+PRESCREEN_Z = 3.0
+PRESCREEN_MIN_FRAMES = 16
+
+# Analysis rate per test, in Hz. The cutoff always runs at the native rate,
+# up to Nyquist, and so does jitter: its statistic is a per-sample crossing
+# rate, which decimation changes (white noise: 0.25 native, 0.08 at 8 kHz).
+# Silence only needs frame energy, so it may run on a polyphase-decimated
+# copy with frames scaled to keep their duration. This costs time rather
+# than saving it (the resampler is slower than the native frame pass) and
+# can change the silence verdict, so the batch CLI and the service do not
+# offer it; bench.py --suite decimate compares it with the native rate.
+# Empty (the default) keeps every test at the native rate.
+DECIMATED_TESTS = ("silence",)
+ANALYSIS_SR = {}
+
+# Bump when scoring logic changes in a way the config below does not capture
+ENGINE_VERSION = 1
+
+# Threads computing independent features and detectors of one analysis; 1
+# runs them inline. Batch and service workers are processes already, so
+# init_worker sets it to 1 there (see set_detector_threads).
+DETECTOR_THREADS = int(os.environ.get("VOICEGUARD_DETECTOR_THREADS", min(2, os.cpu_count() or 1)))
+
+# Frames per block read by the streaming engine; peak memory scales with this
+BLOCK_FRAMES = 256
+
+# analyze_batch groups clips whose lengths fall in the same bucket and caps
+# the clips per FFT call, which bounds the framed batch in memory
+BATCH_BUCKET_SECONDS = 0.5
+BATCH_MAX_CLIPS = 64
+
+# Timeline: the tests are repeated on windows of TIMELINE_WINDOW_HOPS hops
+# of TIMELINE_HOP_SECONDS, so a short synthetic insert is not diluted by the
+# rest of a long recording
+TIMELINE_HOP_SECONDS = 2.0
+TIMELINE_WINDOW_HOPS = 2
+
+# --- FRAME FEATURES ---
+# RMS and zero-crossings read the same strided frame view: no framed copy,
+# no separate full-length crossing mask. Each frame owns the hop_length
+# samples starting at its centre, so per-frame crossing counts add up to the
+# total of librosa.zero_crossings(pad=False) over the signal.
+def frame_view(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=True):
+    if center:
+        y = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(n_fft // 2, n_fft // 2)])
+    return sliding_window_view(y, n_fft, axis=-1)[..., ::hop_length, :]
+
+def frame_rms(frames):
+    power = np.einsum("...ij,...ij->...i", frames, frames)
+    power /= frames.shape[-1]
+    return np.sqrt(power, out=power)
+
+def frame_features(y, n_fft=N_FFT, hop_length=HOP_LENGTH, n_valid=None):
+    # Returns (rms, zc_count) per centered frame. n_valid gives each row's
+    # real length when rows are zero-padded to a common one.
+    frames = frame_view(y, n_fft, hop_length)
+    rms = frame_rms(frames)
+
+    # Samples [t * hop, (t + 1) * hop) plus the one before them
+    start = n_fft // 2 - 1
+    negative = frames[..., start:start + hop_length + 1] < -ZC_THRESHOLD
+    crossings = negative[..., 1:] != negative[..., :-1]
+    # Flattened, the last two axes index samples. Sample 0 has no
+    # predecessor, and past the end there is only zero padding, so the one
+    # spurious crossing is at n_valid (a negative last sample into zeros).
+    samples = crossings.reshape(crossings.shape[:-2] + (-1,))
+    samples[..., 0] = False
+    end = np.full(y.shape[:-1], y.shape[-1]) if n_valid is None else np.asarray(n_valid)
+    np.put_along_axis(samples, end[..., None], False, axis=-1)
+    return rms, np.count_nonzero(crossings, axis=-1)
+
+def decimate(y, sr, target_sr):
+    # Polyphase resampling by the reduced ratio target_sr / sr
+    from scipy.signal import resample_poly
+
+    g = math.gcd(sr, target_sr)
+    return resample_poly(y, target_sr // g, sr // g, axis=-1)
+
+def crossing_variance(zc_count, n_samples):
+    # Variance of a boolean crossing mask is p * (1 - p)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = np.divide(zc_count, n_samples)
+    return p * (1 - p)
+
+# --- SHARED SPECTRAL CONTEXT ---
+# Every test and the spectrogram read from one context, so the STFT (the
+# dominant cost) is computed at most once per upload. Fields are lazy;
+# feature() computes one under its own lock and stage, so detectors on
+# different threads share it instead of racing to compute it twice.
+FEATURE_STAGES = {"magnitude": "stft", "frame_features": "frames"}
+
+class SpectralContext:
+    def __init__(self, y, sr, profile=None):
+        self.y = y
+        self.sr = sr
+        self.profile = profile or StageProfile()
+        self._locks = {name: threading.Lock() for name in FEATURE_STAGES}
+        self._rate_locks = {}
+        self._rate_lock = threading.Lock()
+        self._at_rate = {}
+
+    def feature(self, name):
+        if name not in vars(self):
+            with self._locks[name]:
+                if name not in vars(self):
+                    with self.profile.stage(FEATURE_STAGES[name]):
+                        getattr(self, name)
+        return getattr(self, name)
+
+    @cached_property
+    def magnitude(self):
+        return stft_magnitude(self.y, N_FFT, HOP_LENGTH)
+
+    # librosa.fft_frequencies, without loading librosa's scipy-backed modules
+    @cached_property
+    def freqs(self):
+        return np.fft.rfftfreq(N_FFT, 1.0 / self.sr)
+
+    @cached_property
+    def frame_features(self):
+        return frame_features(self.y, N_FFT, HOP_LENGTH)
+
+    def frame_features_at(self, sr=None):
+        # (rms, zc_count) at analysis rate sr. None, or a rate at or above
+        # the native one, reads the native features.
+        if sr is None or sr >= self.sr:
+            return self.feature("frame_features")
+        with self._rate_lock:
+            lock = self._rate_locks.setdefault(sr, threading.Lock())
+        with lock:
+            if sr not in self._at_rate:
+                with self.profile.stage("resample"):
+                    y = decimate(self.y, self.sr, sr)
+                with self.profile.stage("frames"):
+                    n_fft = max(2, round(N_FFT * sr / self.sr))
+                    hop_length = max(1, round(HOP_LENGTH * sr / self.sr))
+                    self._at_rate[sr] = frame_features(y, n_fft, hop_length)
+        return self._at_rate[sr]
+
+# --- DETECTOR VERSION ---
+# Fingerprint of everything that can change a verdict. Stored results keyed
+# by this are invalidated automatically when any threshold is edited.
+# Per-analysis options replace the module defaults they override; fast mode
+# and per-channel scoring are recorded only when on, so the default
+# configuration keeps its version.
+def detector_config(fast=False, channels=False, cutoff_stride=None, analysis_sr=None):
+    config = {
+        "engine": ENGINE_VERSION,
+        "n_fft": N_FFT,
+        "hop_length": HOP_LENGTH,
+        "zc_threshold": ZC_THRESHOLD,
+        "cutoff_energy_ratio": CUTOFF_ENERGY_RATIO,
+        "cutoff_hz": CUTOFF_HZ,
+        "cutoff_weight": CUTOFF_WEIGHT,
+        "silence_rms": SILENCE_RMS,
+        "silence_weight": SILENCE_WEIGHT,
+        "zc_variation": ZC_VARIATION,
+        "zc_weight": ZC_WEIGHT,
+        "cutoff_stride": CUTOFF_STRIDE if cutoff_stride is None else cutoff_stride,
+        "prescreen_z": PRESCREEN_Z,
+        "prescreen_min_frames": PRESCREEN_MIN_FRAMES,
+        "analysis_sr": ANALYSIS_SR if analysis_sr is None else analysis_sr,
+        "detectors": [detector.name for detector in DETECTORS],
+    }
+    if fast:
+        config["fast"] = True
+    if channels:
+        config["channels"] = True
+    return config
+
+def detector_version(**options):
+    blob = json.dumps(detector_config(**options), sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+# --- SCORING ---
+def cutoff_frequency(energy, freqs):
+    # Frequency below which 99% of the spectral energy lives
+    cumulative_energy = np.cumsum(energy)
+    total_energy = cumulative_energy[-1]
+    threshold_idx = np.searchsorted(cumulative_energy, total_energy * CUTOFF_ENERGY_RATIO)
+    return freqs[threshold_idx]
+
+# Triage estimate from a strided subset of frames. The test only asks
+# whether the share of energy below CUTOFF_HZ reaches CUTOFF_ENERGY_RATIO, so
+# that share is estimated with a ratio estimator and its standard error
+# (finite-population corrected). Returns (cutoff estimate, decided).
+def prescreen_cutoff(sampled, freqs, n_frames, z=PRESCREEN_Z):
+    cutoff_freq = cutoff_frequency(np.sum(sampled, axis=1), freqs)
+    n_low = np.searchsorted(freqs, CUTOFF_HZ)
+    if n_low == len(freqs):
+        # Nyquist below CUTOFF_HZ: the test flags whatever the spectrum
+        return cutoff_freq, True
+    n = sampled.shape[1]
+    per_frame = np.sum(sampled, axis=0, dtype=np.float64)
+    if n < PRESCREEN_MIN_FRAMES or per_frame.sum() <= 0:
+        return cutoff_freq, False
+
+    low = np.sum(sampled[:n_low], axis=0, dtype=np.float64)
+    ratio = low.sum() / per_frame.sum()
+    spread = np.var(low - ratio * per_frame, ddof=1)
+    stderr = np.sqrt(max(0.0, 1 - n / n_frames) * spread / n) / per_frame.mean()
+    return cutoff_freq, abs(ratio - CUTOFF_ENERGY_RATIO) > z * stderr
+
+def cutoff_test(ctx, stride=CUTOFF_STRIDE):
+    # Returns (cutoff_freq, estimated). Once the full STFT exists (e.g. it
+    # was drawn) there is nothing left to save, so the exact value is used.
+    if stride > 1 and "magnitude" not in vars(ctx):
+        with ctx.profile.stage("prescreen"):
+            sampled = stft_magnitude(ctx.y, N_FFT, HOP_LENGTH * stride)
+            cutoff_freq, decided = prescreen_cutoff(sampled, ctx.freqs, 1 + len(ctx.y) // HOP_LENGTH)
+        if decided:
+            return cutoff_freq, True
+    return cutoff_frequency(np.sum(ctx.feature("magnitude"), axis=1), ctx.freqs), False
+
+# --- DETECTORS ---
+# Each test is a plugin: the shared context features it needs, a relative
+# cost, its weight, measure() reducing the features to one statistic and
+# judge() turning that into (flagged, evidence line or None). A new test
+# registers here and reads the same features, so it adds no pass over the
+# audio unless it needs a feature nothing else computes.
+class Detector:
+    name = None
+    title = None
+    needs = ()
+    cost = 1
+    weight = 0
+
+    def features(self, options):
+        return self.needs
+
+    def measure(self, ctx, options):
+        raise NotImplementedError
+
+    def judge(self, value):
+        raise NotImplementedError
+
+# In registration order, which is also the order of the evidence
+DETECTORS = []
+
+def register(cls):
+    DETECTORS.append(cls())
+    return cls
+
+# --- TEST 1: FREQUENCY CUTOFF CHECK ---
+@register
+class CutoffDetector(Detector):
+    name = "cutoff"
+    title = "Frequency cutoff check"
+    needs = ("magnitude",)
+    cost = 10
+    weight = CUTOFF_WEIGHT # INCREASED WEIGHT: Strict penalty for low-quality audio
+
+    def features(self, options):
+        # The pre-screen transforms its own frames and only escalates to the STFT
+        return () if options.get("cutoff_stride", CUTOFF_STRIDE) > 1 else self.needs
+
+    def measure(self, ctx, options):
+        return cutoff_test(ctx, options.get("cutoff_stride", CUTOFF_STRIDE))
+
+    def judge(self, value):
+        cutoff_freq, estimated = value
+        approx = "~" if estimated else ""
+        # UPDATED: Lowered threshold to 14kHz to accept standard laptop mics as Human
+        if cutoff_freq < CUTOFF_HZ:
+            return True, f"⚠️ **Hard Frequency Cutoff detected at {approx}{int(cutoff_freq)}Hz.** (Likely AI/Low-Quality)"
+        return False, f"✅ **Full Frequency Range ({approx}{int(cutoff_freq)}Hz).** (Natural)"
+
+# Tests on frame features that honour the analysis_sr option ({test name:
+# rate}, see ANALYSIS_SR)
+class FrameDetector(Detector):
+    needs = ("frame_features",)
+
+    def analysis_sr(self, options):
+        return options.get("analysis_sr", ANALYSIS_SR).get(self.name)
+
+    def features(self, options):
+        # A decimated copy is made inside measure(), under its own lock
+        return () if self.analysis_sr(options) else self.needs
+
+    def frame_features(self, ctx, options):
+        return ctx.frame_features_at(self.analysis_sr(options))
+
+# --- TEST 2: SILENCE PATTERN ANALYSIS ---
+@register
+class SilenceDetector(FrameDetector):
+    name = "silence"
+    title = "Silence check"
+    weight = SILENCE_WEIGHT # INCREASED WEIGHT
+
+    def measure(self, ctx, options):
+        rms, _ = self.frame_features(ctx, options)
+        return np.min(rms)
+
+    def judge(self, min_silence):
+        # UPDATED: Made silence check stricter (needs to be near absolute zero to flag as AI)
+        if min_silence < SILENCE_RMS:
+            return True, "⚠️ **Unnatural 'Digital Silence' detected.** (Lack of room tone)"
+        return False, "✅ **Natural Background Noise detected.** (Room tone present)"
+
+# --- TEST 3: DISPERSION / JITTER ---
+@register
+class JitterDetector(Detector):
+    name = "jitter"
+    title = "Jitter check"
+    needs = ("frame_features",)
+    weight = ZC_WEIGHT
+
+    def measure(self, ctx, options):
+        _, zc_count = ctx.feature("frame_features")
+        return crossing_variance(np.sum(zc_count), len(ctx.y))
+
+    def judge(self, zc_variation):
+        if zc_variation < ZC_VARIATION:
+            return True, "⚠️ **Signal is too smooth.** (Lacks organic jitter)"
+        return False, None
+
+def score_detections(values):
+    # values maps detector name -> statistic, or None if it was skipped.
+    # Detectors an engine does not evaluate are simply absent.
+    ai_score = 0
+    evidence = []
+    for detector in DETECTORS:
+        if detector.name not in values:
+            continue
+        value = values[detector.name]
+        if value is None:
+            # Fast verdict mode: earlier tests had already decided the verdict
+            evidence.append(f"⏭️ **{detector.title} skipped.** (Verdict already decided)")
+            continue
+        flagged, line = detector.judge(value)
+        if flagged:
+            ai_score += detector.weight
+        if line:
+            evidence.append(line)
+    return min(ai_score, 100), evidence
+
+def score_features(cutoff_freq, min_silence, zc_variation, cutoff_estimated=False):
+    # The built-in statistics, as the streaming, batch and live engines compute them
+    return score_detections({
+        "cutoff": None if cutoff_freq is None else (cutoff_freq, cutoff_estimated),
+        "silence": min_silence,
+        "jitter": zc_variation,
+    })
+
+def verdict_label(score):
+    # None is a silent channel (see analyze_channels)
+    if score is None:
+        return "SILENT"
+    return "AI" if score >= VERDICT_THRESHOLD else "HUMAN"
+
+def verdict_decided(score, pending_weight):
+    # True when tests worth pending_weight more can no longer flip the verdict
+    return score >= VERDICT_THRESHOLD or score + pending_weight < VERDICT_THRESHOLD
+
+# --- DETECTOR EXECUTOR ---
+# Every feature the detectors need is computed in one concurrent step (the
+# STFT alongside the frame pass), then the detectors run concurrently;
+# NumPy and the FFT release the GIL. With fast=True they run instead in
+# waves of equal cost, cheapest first, and the remaining waves are skipped
+# once they can no longer flip the verdict.
+_pool = None
+_pool_lock = threading.Lock()
+
+def _reset_pool():
+    # A forked child inherits the pool object but none of its threads
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+# Not on Windows, which has no fork
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool)
+
+def detector_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None and DETECTOR_THREADS > 1:
+            _pool = ThreadPoolExecutor(max_workers=DETECTOR_THREADS, thread_name_prefix="detector")
+    return _pool
+
+def set_detector_threads(threads):
+    # Any running pool is shut down; the next analysis starts one of the new
+    # size, or runs inline for 1
+    global DETECTOR_THREADS, _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+        DETECTOR_THREADS = threads
+    if pool is not None:
+        pool.shutdown()
+
+def _measure(ctx, detector, options):
+    with ctx.profile.stage(detector.name):
+        return detector.measure(ctx, options)
+
+def run_detectors(ctx, detectors=None, fast=False, **options):
+    detectors = DETECTORS if detectors is None else detectors
+    pool = detector_pool()
+    run = pool.map if pool is not None else map
+
+    waves = {}
+    for detector in detectors:
+        waves.setdefault(detector.cost if fast else 0, []).append(detector)
+    pending = sum(detector.weight for detector in detectors)
+
+    values = {}
+    for cost in sorted(waves):
+        wave = waves[cost]
+        if fast and values and verdict_decided(score_detections(values)[0], pending):
+            values.update((detector.name, None) for detector in wave)
+            continue
+        needed = sorted({name for detector in wave for name in detector.features(options)})
+        list(run(ctx.feature, needed))
+        measured = run(lambda detector: _measure(ctx, detector, options), wave)
+        values.update((detector.name, value) for detector, value in zip(wave, measured))
+        pending -= sum(detector.weight for detector in wave)
+    return values
+
+# --- THE FORENSIC ENGINE ---
+# `source` may be a path, raw bytes / memoryview or a file-like object
+def load_context(source, profile=None):
+    profile = profile or StageProfile()
+    # Load audio (y = audio time series, sr = sampling rate)
+    with profile.stage("decode"), decodable(source) as src:
+        y, sr = load_audio(src)
+    if len(y) == 0:
+        raise ValueError("no audio samples")
+    return SpectralContext(y, sr, profile)
+
+# Per-stage timings end up in ctx.profile.as_dict(). Silence and jitter
+# share one pass over the samples, which runs alongside the STFT the cutoff
+# needs. With fast=True they run first, and a test whose outcome can no
+# longer change the verdict is skipped (noted in the evidence); the score is
+# then a lower bound.
+# cutoff_stride > 1 pre-screens the cutoff from every Nth frame, and
+# analysis_sr maps tests to the rate they run at (see ANALYSIS_SR).
+def analyze_context(ctx, fast=False, cutoff_stride=CUTOFF_STRIDE, analysis_sr=None):
+    values = run_detectors(
+        ctx, fast=fast, cutoff_stride=cutoff_stride, analysis_sr=ANALYSIS_SR if analysis_sr is None else analysis_sr,
+    )
+    score, evidence = score_detections(values)
+    return score, evidence, ctx
+
+def analyze_audio_forensics(source, fast=False, cutoff_stride=CUTOFF_STRIDE, analysis_sr=None):
+    return analyze_context(load_context(source), fast, cutoff_stride, analysis_sr)
+
+# --- MULTI-CHANNEL ENGINE ---
+# Each channel gets its own verdict, so a splice confined to one channel is
+# not averaged away by a downmix. All channels' STFTs come from one batched
+# stft_magnitude call, whose blocks span every channel in the same scratch
+# buffers, and the frame features from one pass over the (channels,
+# samples) view; each channel's context holds views into those, not copies.
+# The aggregate verdict is that of the highest-scoring channel. A channel
+# with no signal (a dead or muted leg) would score as digital silence, so it
+# is reported as silent, with score None, and left out of the aggregate
+# unless every channel is silent.
+SILENT_CHANNEL = (None, ["🔇 **Silent channel.** (No signal; left out of the verdict)"])
+class ChannelSet:
+    def __init__(self, y, sr, profile=None):
+        self.y = y
+        self.sr = sr
+        self.profile = profile or StageProfile()
+        self.channels = [SpectralContext(channel, sr, self.profile) for channel in y]
+        self.results = []
+        self.worst = None
+
+    def prefetch(self, names):
+        if "frame_features" in names:
+            with self.profile.stage("frames"):
+                rms, zc_count = frame_features(self.y, N_FFT, HOP_LENGTH)
+            for ctx, channel_rms, channel_zc in zip(self.channels, rms, zc_count):
+                vars(ctx)["frame_features"] = (channel_rms, channel_zc)
+        if "magnitude" in names:
+            with self.profile.stage("stft"):
+                magnitude = stft_magnitude(self.y, N_FFT, HOP_LENGTH)
+            for ctx, channel in zip(self.channels, magnitude):
+                vars(ctx)["magnitude"] = channel
+
+def load_channel_set(source, profile=None):
+    profile = profile or StageProfile()
+    with profile.stage("decode"), decodable(source) as src:
+        y, sr = load_channels(src)
+    if y.shape[-1] == 0:
+        raise ValueError("no audio samples")
+    return ChannelSet(y, sr, profile)
+
+def analyze_channels(source, fast=False, cutoff_stride=CUTOFF_STRIDE, analysis_sr=None):
+    channel_set = load_channel_set(source)
+    options = {"cutoff_stride": cutoff_stride, "analysis_sr": ANALYSIS_SR if analysis_sr is None else analysis_sr}
+    needed = {name for detector in DETECTORS for name in detector.features(options)}
+    if fast:
+        # A channel may be decided before its cutoff test; those that are
+        # not compute their own STFT
+        needed.discard("magnitude")
+    channel_set.prefetch(needed)
+
+    y = channel_set.y
+    silent = np.maximum(y.max(axis=1), -y.min(axis=1)) <= ZC_THRESHOLD
+    if silent.all():
+        silent[:] = False
+    results = [
+        SILENT_CHANNEL if quiet else analyze_context(ctx, fast, cutoff_stride, analysis_sr)[:2]
+        for ctx, quiet in zip(channel_set.channels, silent)
+    ]
+    channel_set.results = results
+    scored = [c for c in range(len(results)) if not silent[c]]
+    channel_set.worst = worst = max(scored, key=lambda c: results[c][0])
+    score, evidence = results[worst]
+    if len(results) > 1:
+        scores = ", ".join(f"ch{c + 1} " + ("silent" if s is None else f"{s}%") for c, (s, _) in enumerate(results))
+        evidence = [f"🎚️ **Channel {worst + 1} of {len(results)} scores highest.** (Per channel: {scores})", *evidence]
+    return score, evidence, channel_set
+
+# --- BATCH ENGINE ---
+# Many short clips at one sample rate. Each bucket is zero-padded to its
+# longest clip, framed into a (clips, n_fft, frames) view and transformed
+# with a single stft_magnitude call. Frames past a clip's own end (and
+# zero-crossings past its last sample) are masked out, so per-clip results
+# equal the scalar path.
+def _batch_features(batch, lengths):
+    n_frames = 1 + lengths // HOP_LENGTH
+    valid = np.arange(1 + batch.shape[1] // HOP_LENGTH) < n_frames[:, None]
+
+    magnitude = stft_magnitude(batch, N_FFT, HOP_LENGTH)
+    magnitude *= valid[:, None, :]
+    energy = np.sum(magnitude, axis=2)
+
+    rms, zc_count = frame_features(batch, N_FFT, HOP_LENGTH, n_valid=lengths)
+    min_rms = np.where(valid, rms, np.inf).min(axis=1)
+    return energy, min_rms, crossing_variance(zc_count.sum(axis=1), lengths)
+
+def _batch_cutoffs(energy, freqs):
+    # Row-wise cutoff_frequency: searchsorted(left) == count of smaller values
+    cumulative = np.cumsum(energy, axis=1)
+    threshold_idx = np.count_nonzero(cumulative < cumulative[:, -1:] * CUTOFF_ENERGY_RATIO, axis=1)
+    return freqs[threshold_idx]
+
+def analyze_batch(clips, sr, bucket_seconds=BATCH_BUCKET_SECONDS, max_clips=BATCH_MAX_CLIPS):
+    # clips: float32 mono arrays sharing sr; returns [(score, evidence), ...]
+    freqs = np.fft.rfftfreq(N_FFT, 1.0 / sr)
+    bucket_width = max(1, int(bucket_seconds * sr))
+    buckets = {}
+    for i, y in enumerate(clips):
+        buckets.setdefault(len(y) // bucket_width, []).append(i)
+
+    results = [None] * len(clips)
+    for members in buckets.values():
+        for start in range(0, len(members), max_clips):
+            group = members[start:start + max_clips]
+            lengths = np.array([len(clips[i]) for i in group])
+            batch = np.zeros((len(group), lengths.max()), dtype=np.float32)
+            for row, i in enumerate(group):
+                batch[row, :lengths[row]] = clips[i]
+
+            energy, min_rms, zc_variation = _batch_features(batch, lengths)
+            cutoffs = _batch_cutoffs(energy, freqs)
+            for row, i in enumerate(group):
+                results[i] = score_features(cutoffs[row], min_rms[row], zc_variation[row])
+    return results
+
+# --- TIMELINE ---
+# Per-window scores from the context's one STFT and frame features. Frames
+# are reduced once into hop-sized blocks (energy per bin, minimum RMS,
+# crossings and the samples they cover); each window then sums or mins a
+# few consecutive blocks, so the cost is one pass over the magnitude
+# whatever the overlap. Windows are scored with the same thresholds as the
+# whole file, and overlapping flagged windows are merged into time ranges.
+def score_timeline(ctx, hop_seconds=TIMELINE_HOP_SECONDS, window_hops=TIMELINE_WINDOW_HOPS):
+    magnitude = ctx.feature("magnitude")
+    rms, zc_count = ctx.feature("frame_features")
+    with ctx.profile.stage("timeline"):
+        n_samples = len(ctx.y)
+        n_frames = magnitude.shape[1]
+        hop_frames = max(1, round(hop_seconds * ctx.sr / HOP_LENGTH))
+        starts = np.arange(0, n_frames, hop_frames)
+        bounds = np.minimum(np.append(starts, n_frames) * HOP_LENGTH, n_samples)
+
+        energy = np.add.reduceat(magnitude, starts, axis=1)
+        block_rms = np.minimum.reduceat(rms, starts)
+        block_zc = np.add.reduceat(zc_count, starts)
+        block_samples = np.diff(bounds)
+
+        width = min(window_hops, len(starts))
+        energy = sliding_window_view(energy, width, axis=1).sum(axis=-1)
+        min_rms = sliding_window_view(block_rms, width).min(axis=-1)
+        zc_variation = crossing_variance(
+            sliding_window_view(block_zc, width).sum(axis=-1), sliding_window_view(block_samples, width).sum(axis=-1),
+        )
+        cutoffs = _batch_cutoffs(energy.T, ctx.freqs)
+
+        begin = bounds[:len(cutoffs)] / ctx.sr
+        end = bounds[width:width + len(cutoffs)] / ctx.sr
+        scores = [
+            int(score_features(cutoff_freq, silence, jitter)[0])
+            for cutoff_freq, silence, jitter in zip(cutoffs, min_rms, zc_variation)
+        ]
+        flagged = []
+        for t0, t1, score in zip(begin, end, scores):
+            if score < VERDICT_THRESHOLD or t1 <= t0:
+                continue
+            if flagged and t0 <= flagged[-1][1]:
+                flagged[-1][1] = float(t1)
+            else:
+                flagged.append([float(t0), float(t1)])
+    return {
+        "hop_seconds": hop_frames * HOP_LENGTH / ctx.sr,
+        "window_seconds": width * hop_frames * HOP_LENGTH / ctx.sr,
+        "start": begin.tolist(),
+        "end": end.tolist(),
+        "scores": scores,
+        "flagged": flagged,
+    }
+
+# --- STREAMING ENGINE ---
+# Cuts whole frames (n_fft long, hop_length apart) out of a sample stream,
+# carrying the unused tail over to the next block
+class FrameCutter:
+    def __init__(self, n_fft=N_FFT, hop_length=HOP_LENGTH, pad=0):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self._carry = np.zeros(pad, dtype=np.float32)
+
+    def push(self, y):
+        # Returns a chunk holding only whole frames, or None
+        buf = np.concatenate((self._carry, y))
+        if len(buf) < self.n_fft:
+            self._carry = buf
+            return None
+        n_frames = 1 + (len(buf) - self.n_fft) // self.hop_length
+        self._carry = buf[n_frames * self.hop_length:]
+        return buf[:(n_frames - 1) * self.hop_length + self.n_fft]
+
+# Running accumulators over a block-wise read. Frames are cut from a stream
+# padded with n_fft // 2 zeros at both ends, which reproduces the centered
+# framing of librosa.stft / librosa.feature.rms exactly, so the verdict
+# matches the in-memory path while memory stays bounded by the block.
+class StreamingAccumulator:
+    def __init__(self, sr, n_fft=N_FFT, hop_length=HOP_LENGTH, profile=None):
+        self.sr = sr
+        self.profile = profile or StageProfile()
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.energy = np.zeros(1 + n_fft // 2)
+        self.min_rms = np.inf
+        self.zc_count = 0
+        self.n_samples = 0
+        self._frames = FrameCutter(n_fft, hop_length, pad=n_fft // 2)
+        self._last_negative = -1
+
+    def update(self, y):
+        with self.profile.stage("zcr"):
+            count, self._last_negative = crossing_count(y, self._last_negative, ZC_THRESHOLD)
+            self.zc_count += int(count)
+            self.n_samples += len(y)
+        self._consume(self._frames.push(y))
+
+    def finalize(self):
+        self._consume(self._frames.push(np.zeros(self.n_fft // 2, dtype=np.float32)))
+        return self
+
+    @property
+    def freqs(self):
+        return np.fft.rfftfreq(self.n_fft, 1.0 / self.sr)
+
+    @property
+    def cutoff_freq(self):
+        return cutoff_frequency(self.energy, self.freqs)
+
+    @property
+    def zc_variation(self):
+        return crossing_variance(self.zc_count, self.n_samples)
+
+    def _consume(self, chunk):
+        if chunk is None:
+            return
+
+        with self.profile.stage("stft"):
+            add_frame_sums(self.energy, stft_magnitude(chunk, self.n_fft, self.hop_length, center=False))
+
+        with self.profile.stage("rms"):
+            self.min_rms = min(self.min_rms, float(min_frame_rms(chunk, self.n_fft, self.hop_length)))
+
+def analyze_audio_forensics_streaming(source, block_frames=BLOCK_FRAMES):
+    # WAV payloads are memory-mapped; other formats stream through soundfile
+    with decodable(source) as src, open_blocks(src, block_frames * HOP_LENGTH) as (sr, blocks):
+        acc = StreamingAccumulator(sr)
+        while True:
+            with acc.profile.stage("decode"):
+                block = next(blocks, None)
+            if block is None:
+                break
+            acc.update(block)
+    if acc.n_samples == 0:
+        raise ValueError("no audio samples")
+    acc.finalize()
+
+    with acc.profile.stage("cutoff"):
+        cutoff_freq = acc.cutoff_freq
+    score, evidence = score_features(cutoff_freq, acc.min_rms, acc.zc_variation)
+    return score, evidence, acc
+
+# --- HEADLESS ENTRY POINT ---
+# One analysis as plain data, for the batch CLI and the service, whose pool
+# workers return it across the process boundary: score, verdict, evidence
+# and stage timings, plus per-channel rows and the timeline when asked for.
+def analyze(source, *, streaming=False, fast=False, cutoff_stride=CUTOFF_STRIDE, channels=False, timeline=False):
+    if streaming and (channels or timeline):
+        raise ValueError("channels and timeline need the in-memory engine")
+    if streaming:
+        score, evidence, ctx = analyze_audio_forensics_streaming(source)
+    elif channels:
+        score, evidence, ctx = analyze_channels(source, fast, cutoff_stride)
+    else:
+        score, evidence, ctx = analyze_audio_forensics(source, fast, cutoff_stride)
+    result = {"score": int(score), "verdict": verdict_label(score), "evidence": evidence}
+    if channels:
+        result["channels"] = [
+            {"score": None if s is None else int(s), "verdict": verdict_label(s), "evidence": e} for s, e in ctx.results
+        ]
+    if timeline:
+        # Per channel, the timeline follows the channel that scored highest
+        result["timeline"] = score_timeline(ctx.channels[ctx.worst] if channels else ctx)
+    result["timings"] = ctx.profile.as_dict()
+    return result
+
+# --- WORKER SETUP ---
+# Runs the decoder and both engines on a second of synthetic noise, so the
+# process pays for imports, kernel compilation (or loading it from the Numba
+# cache), FFT setup and scratch buffers before its first real clip. Run in
+# a parent before its pool forks, every worker starts with all of it already
+# done.
+WARMUP_SR = 44100
+_warm = False
+
+def warmup_engine(sr=WARMUP_SR):
+    global _warm
+    import soundfile as sf
+
+    warmup(N_FFT, HOP_LENGTH)
+    y = np.random.default_rng(0).normal(0, 0.1, sr).astype(np.float32)
+    wav = io.BytesIO()
+    sf.write(wav, y, sr, format="WAV", subtype="FLOAT")
+    analyze_audio_forensics(wav.getvalue())
+    analyze_audio_forensics_streaming(wav.getvalue())
+    _warm = True
+
+# Pool initializer for the batch CLI and the service: the FFT backend is
+# chosen and the engine warmed before the first job arrives. Workers forked
+# from a warmed parent skip the warmup. Detectors run inline: the pool
+# already gives one analysis per process, and the parent forks with no
+# detector threads alive.
+def init_worker(fft_backend=FFT_BACKEND, fft_workers=FFT_WORKERS):
+    set_detector_threads(1)
+    set_backend(fft_backend, fft_workers)
+    if not _warm:
+        warmup_engine()
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows has neither /proc nor getrusage
+    resource = None
+
+# tracemalloc slows allocation-heavy stages noticeably, so it is opt-in
+TRACE_MEMORY = os.environ.get("VOICEGUARD_TRACE_MEMORY") == "1"
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        # No /proc (macOS): fall back to the peak, which still shows growth
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# --- STAGE PROFILE ---
+# Wall time and memory per pipeline stage. Stages entered repeatedly (the
+# per-block stages of the streaming engine) accumulate. A stage entered
+# inside another on the same thread (a feature computed on demand by a
+# detector) is charged to the inner stage only, so stages never double count.
+# Stages may run on several threads at once. RSS is sampled (a read of
+# /proc/self/statm) only on the first entry of each stage; later entries,
+# such as the streaming engine's per-block stages, cost a perf_counter pair.
+class StageProfile:
+    def __init__(self, trace_memory=TRACE_MEMORY):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            alloc_start = tracemalloc.get_traced_memory()[0]
+        # Time and RSS growth of the stages nested in this one
+        nested = self._local.__dict__.setdefault("nested", [])
+        nested.append([0.0, 0.0])
+        sample_rss = name not in self.stages
+        rss_start = current_rss_mb() if sample_rss else 0.0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss_delta = current_rss_mb() - rss_start if sample_rss else 0.0
+            inner_seconds, inner_rss = nested.pop()
+            if nested:
+                nested[-1][0] += elapsed
+                nested[-1][1] += rss_delta
+            with self._lock:
+                entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "rss_delta_mb": 0.0})
+                entry["seconds"] += elapsed - inner_seconds
+                entry["calls"] += 1
+                entry["rss_delta_mb"] += rss_delta - inner_rss
+                if tracing:
+                    peak = (tracemalloc.get_traced_memory()[1] - alloc_start) / (1024 * 1024)
+                    entry["alloc_peak_mb"] = max(entry.get("alloc_peak_mb", 0.0), peak)
+
+    @property
+    def total_seconds(self):
+        return sum(entry["seconds"] for entry in self.stages.values())
+
+    def as_dict(self):
+        return {
+            "total_seconds": self.total_seconds,
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+        }
+
+# --- METRICS ---
+# Minimal Prometheus text-format registry for the headless entry points,
+# so no client library is needed to expose or scrape them.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts, total, n = self._histograms.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= bound) for c, bound in zip(counts, self.buckets)]
+            self._histograms[key] = (counts, total + value, n + 1)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+
+        for kind, items in (("counter", counters), ("histogram", histograms)):
+            seen = set()
+            for (name, labels), value in items:
+                if name not in seen:
+                    seen.add(name)
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+                counts, total, n = value
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(float(bound))),))} {count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {n}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {n}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+# Process-wide registry used by the batch CLI and the service
+METRICS = Metrics()
+METRICS.describe("voiceguard_analyses_total", "Completed analyses by verdict.")
+METRICS.describe("voiceguard_analysis_errors_total", "Analyses that raised.")
+METRICS.describe("voiceguard_stage_seconds", "Wall time per pipeline stage.")
+METRICS.describe("voiceguard_analysis_seconds", "Wall time per analysis.")
+
+def record_analysis(profile, verdict, metrics=METRICS):
+    # profile is StageProfile.as_dict(), so it can come from another process
+    metrics.inc("voiceguard_analyses_total", verdict=verdict)
+    metrics.observe("voiceguard_analysis_seconds", profile["total_seconds"])
+    for name, entry in profile["stages"].items():
+        metrics.observe("voiceguard_stage_seconds", entry["seconds"], stage=name)
@@ -0,0 +1,151 @@
+import math
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Compiled kernels are cached on disk here and shared by every process on
+# the machine, so only the first one after an install or upgrade compiles.
+# NUMBA_CACHE_DIR is honoured if set; "" keeps Numba's own __pycache__ choice.
+NUMBA_CACHE_DIR = os.environ.get(
+    "VOICEGUARD_NUMBA_CACHE",
+    os.environ.get("NUMBA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "voiceguard", "numba")),
+)
+
+# Per-block accumulator kernels for the streaming and live engines. With
+# small blocks the NumPy versions spend most of their time in call overhead
+# and temporaries, so when Numba is installed each becomes one compiled loop.
+# VOICEGUARD_NUMBA=0 forces the NumPy versions.
+ACCELERATED = numba is not None and os.environ.get("VOICEGUARD_NUMBA", "auto") != "0"
+
+# --- NUMPY KERNELS ---
+def _crossing_count_numpy(y, last_negative, threshold):
+    # Crossings in y, continuing from the previous block's last sign
+    # (-1: no previous block). Returns (count, last_negative).
+    if len(y) == 0:
+        return 0, last_negative
+    negative = y < -threshold
+    count = int(np.count_nonzero(negative[1:] != negative[:-1]))
+    if last_negative >= 0 and last_negative != negative[0]:
+        count += 1
+    return count, int(negative[-1])
+
+def _min_frame_rms_numpy(chunk, n_fft, hop_length):
+    # chunk holds whole frames only (no centering)
+    frames = sliding_window_view(chunk, n_fft)[::hop_length]
+    power = np.einsum("ij,ij->i", frames, frames)
+    return float(np.sqrt(power.min() / n_fft))
+
+def _frame_rms_values_numpy(chunk, n_fft, hop_length):
+    # RMS of every frame of a chunk holding whole frames only
+    frames = sliding_window_view(chunk, n_fft)[::hop_length]
+    power = np.einsum("ij,ij->i", frames, frames)
+    return np.sqrt(power / n_fft)
+
+def _add_frame_sums_numpy(energy, magnitude):
+    energy += np.sum(magnitude, axis=1)
+
+def _ring_update_numpy(ring, energy, frames, pos):
+    # Writes frames (frames x bins) into the ring from pos, keeping energy
+    # equal to the ring's column sums. Returns the next write position.
+    for column in frames:
+        energy += column - ring[pos]
+        ring[pos] = column
+        pos = (pos + 1) % len(ring)
+        if pos == 0:
+            # Re-sum once per wrap so add/subtract rounding cannot drift
+            energy[:] = ring.sum(axis=0)
+    return pos
+
+# --- NUMBA KERNELS ---
+# Same contracts as above, written as plain loops for the JIT
+def _crossing_count_loop(y, last_negative, threshold):
+    count = 0
+    previous = last_negative
+    for i in range(len(y)):
+        negative = 1 if y[i] < -threshold else 0
+        if previous >= 0 and negative != previous:
+            count += 1
+        previous = negative
+    return count, previous
+
+def _min_frame_rms_loop(chunk, n_fft, hop_length):
+    lowest = np.inf
+    for start in range(0, len(chunk) - n_fft + 1, hop_length):
+        power = 0.0
+        for i in range(start, start + n_fft):
+            power += chunk[i] * chunk[i]
+        lowest = min(lowest, power)
+    return np.sqrt(lowest / n_fft)
+
+def _frame_rms_values_loop(chunk, n_fft, hop_length):
+    # Squares are summed once per segment of gcd(n_fft, hop_length) samples;
+    # each frame then adds up the segments it spans
+    step = math.gcd(n_fft, hop_length)
+    segments = np.zeros(len(chunk) // step)
+    for s in range(len(segments)):
+        for i in range(s * step, (s + 1) * step):
+            segments[s] += chunk[i] * chunk[i]
+    rms = np.empty((len(chunk) - n_fft) // hop_length + 1)
+    for t in range(len(rms)):
+        first = t * hop_length // step
+        rms[t] = np.sqrt(np.sum(segments[first:first + n_fft // step]) / n_fft)
+    return rms
+
+def _add_frame_sums_loop(energy, magnitude):
+    n_bins, n_frames = magnitude.shape
+    for t in range(n_frames):
+        for b in range(n_bins):
+            energy[b] += magnitude[b, t]
+
+def _ring_update_loop(ring, energy, frames, pos):
+    n_slots, n_bins = ring.shape
+    for t in range(frames.shape[0]):
+        for b in range(n_bins):
+            energy[b] += frames[t, b] - ring[pos, b]
+            ring[pos, b] = frames[t, b]
+        pos = (pos + 1) % n_slots
+        if pos == 0:
+            for b in range(n_bins):
+                energy[b] = 0.0
+            for slot in range(n_slots):
+                for b in range(n_bins):
+                    energy[b] += ring[slot, b]
+    return pos
+
+if ACCELERATED:
+    # Read when each kernel is decorated, so this works even if Numba was
+    # imported (by librosa, say) before this module
+    numba.config.CACHE_DIR = NUMBA_CACHE_DIR
+    _jit = numba.njit(cache=True, nogil=True)
+    crossing_count = _jit(_crossing_count_loop)
+    min_frame_rms = _jit(_min_frame_rms_loop)
+    frame_rms_values = _jit(_frame_rms_values_loop)
+    add_frame_sums = _jit(_add_frame_sums_loop)
+    ring_update = _jit(_ring_update_loop)
+else:
+    crossing_count = _crossing_count_numpy
+    min_frame_rms = _min_frame_rms_numpy
+    frame_rms_values = _frame_rms_values_numpy
+    add_frame_sums = _add_frame_sums_numpy
+    ring_update = _ring_update_numpy
+
+# --- WARMUP ---
+# Compiles every kernel for the dtypes and layouts the engines pass in, so
+# the first real request does not pay JIT latency. Cheap without Numba.
+def warmup(n_fft=2048, hop_length=512):
+    block = np.zeros(n_fft + hop_length, dtype=np.float32)
+    magnitude = np.zeros((1 + n_fft // 2, 2), dtype=np.float32, order="F")
+    energy = np.zeros(1 + n_fft // 2)
+    crossing_count(block, -1, 1e-10)
+    min_frame_rms(block, n_fft, hop_length)
+    frame_rms_values(block, n_fft, hop_length)
+    add_frame_sums(energy, magnitude)
+    # A single-frame block is C- as well as F-contiguous: its own signature
+    add_frame_sums(energy, magnitude[:, :1])
+    ring_update(np.zeros((2, 1 + n_fft // 2)), energy, magnitude.T, 0)
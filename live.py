@@ -0,0 +1,174 @@
+import argparse
+import json
+import socket
+import sys
+
+import numpy as np
+
+from audio_io import decodable, open_blocks
+from forensics import (
+    HOP_LENGTH, N_FFT, ZC_THRESHOLD, FrameCutter, crossing_variance, cutoff_frequency, score_features, verdict_label,
+)
+from kernels import crossing_count, frame_rms_values, ring_update, warmup
+from spectral import stft_magnitude
+
+WINDOW_SECONDS = 5.0
+VERDICT_MS = 500
+
+# Raw PCM sample formats accepted on pipes and sockets
+PCM_FORMATS = {"s16le": ("<i2", 1 / 32768), "s32le": ("<i4", 1 / 2147483648), "f32le": ("<f4", 1.0)}
+
+# --- SLIDING-WINDOW DETECTOR ---
+# Live counterpart of the forensic engine. Each STFT frame's magnitude
+# column, RMS and zero-crossing count go into a ring buffer covering the
+# last window_seconds; the per-bin energy sum is kept as a running total.
+# Work per pushed block is proportional to the new frames only, and a
+# verdict over the current window is emitted every verdict_ms.
+class LiveDetector:
+    def __init__(self, sr, window_seconds=WINDOW_SECONDS, verdict_ms=VERDICT_MS, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window_frames = max(1, int(round(window_seconds * sr / hop_length)))
+        self.verdict_frames = max(1, int(round(verdict_ms / 1000 * sr / hop_length)))
+        self.freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+
+        self._magnitude = np.zeros((self.window_frames, 1 + n_fft // 2))
+        self._rms = np.full(self.window_frames, np.inf)
+        self._zc = np.zeros(self.window_frames, dtype=np.int64)
+        self._energy = np.zeros(1 + n_fft // 2)
+        self._pos = 0
+        self._filled = 0
+        self._frames_seen = 0
+        self._since_verdict = 0
+
+        self._cutter = FrameCutter(n_fft, hop_length)
+        # Sign of the last sample counted for zero-crossings (-1: none yet)
+        self._last_negative = -1
+
+    def push(self, y):
+        # Returns the verdicts that became due while consuming y
+        chunk = self._cutter.push(y)
+        if chunk is None:
+            return []
+
+        magnitude = stft_magnitude(chunk, self.n_fft, self.hop_length, center=False)
+        rms = frame_rms_values(chunk, self.n_fft, self.hop_length)
+        # Every frame owns the hop_length samples it advances the stream by,
+        # which the chunk holds from its start
+        n_new = magnitude.shape[1]
+        zc = np.empty(n_new, dtype=np.int64)
+        for t in range(n_new):
+            owned = chunk[t * self.hop_length:(t + 1) * self.hop_length]
+            zc[t], self._last_negative = crossing_count(owned, self._last_negative, ZC_THRESHOLD)
+
+        # Frames go in as runs that end where a verdict falls due
+        verdicts = []
+        start = 0
+        while start < n_new:
+            run = min(n_new - start, self.verdict_frames - self._since_verdict, self.window_frames)
+            self._add_frames(magnitude[:, start:start + run], rms[start:start + run], zc[start:start + run])
+            start += run
+            self._since_verdict += run
+            if self._since_verdict >= self.verdict_frames:
+                self._since_verdict = 0
+                verdicts.append(self.verdict())
+        return verdicts
+
+    def _add_frames(self, magnitude, rms, zc):
+        # At most window_frames at a time, so no slot is written twice
+        slots = (self._pos + np.arange(len(rms))) % self.window_frames
+        self._rms[slots] = rms
+        self._zc[slots] = zc
+        # Per-bin running energy; re-summed on every wrap so it cannot drift
+        self._pos = ring_update(self._magnitude, self._energy, magnitude.T, self._pos)
+        self._filled = min(self._filled + len(rms), self.window_frames)
+        self._frames_seen += len(rms)
+
+    def window_features(self):
+        cutoff_freq = cutoff_frequency(self._energy, self.freqs)
+        min_silence = float(np.min(self._rms))
+        return cutoff_freq, min_silence, crossing_variance(self._zc.sum(), self._filled * self.hop_length)
+
+    def verdict(self):
+        score, evidence = score_features(*self.window_features())
+        return {
+            "time": ((self._frames_seen - 1) * self.hop_length + self.n_fft) / self.sr,
+            "window_seconds": ((self._filled - 1) * self.hop_length + self.n_fft) / self.sr,
+            "score": int(score),
+            "verdict": verdict_label(score),
+            "evidence": evidence,
+        }
+
+# --- PCM SOURCES ---
+def iter_pcm(stream, channels=1, fmt="s16le", block_ms=100, sr=16000):
+    # Float32 mono blocks from a raw PCM byte stream (pipe, socket file)
+    dtype, scale = PCM_FORMATS[fmt]
+    frame_bytes = np.dtype(dtype).itemsize * channels
+    block_bytes = max(1, int(sr * block_ms / 1000)) * frame_bytes
+    leftover = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        data = leftover + data
+        usable = len(data) - len(data) % frame_bytes
+        leftover = data[usable:]
+        if usable:
+            samples = np.frombuffer(data[:usable], dtype=dtype).reshape(-1, channels)
+            y = np.add.reduce(samples, axis=1, dtype=np.float32)
+            y *= np.float32(scale / channels)
+            yield y
+
+def detect_stream(blocks, sr, **kwargs):
+    detector = LiveDetector(sr, **kwargs)
+    for block in blocks:
+        yield from detector.push(block)
+
+def detect_recording(source, block_size=HOP_LENGTH * 4, **kwargs):
+    # Replays a finished recording (e.g. st.audio_input) block by block
+    with decodable(source) as src, open_blocks(src, block_size) as (sr, blocks):
+        return list(detect_stream(blocks, sr, **kwargs))
+
+def serve(host, port, args, out):
+    # One caller at a time; verdicts go back over the same connection
+    with socket.create_server((host, port)) as server:
+        print(f"Listening on {host}:{port}", file=sys.stderr)
+        while True:
+            conn, addr = server.accept()
+            with conn, conn.makefile("rb") as reader:
+                blocks = iter_pcm(reader, args.channels, args.format, args.block_ms, args.sr)
+                try:
+                    for verdict in detect_stream(blocks, args.sr, window_seconds=args.window, verdict_ms=args.every):
+                        line = json.dumps(verdict, ensure_ascii=False) + "\n"
+                        out.write(line)
+                        out.flush()
+                        conn.sendall(line.encode("utf-8"))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VoiceGuard live sliding-window detection over raw PCM.")
+    parser.add_argument("--sr", type=int, default=16000, help="Sample rate of the incoming PCM")
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--format", choices=sorted(PCM_FORMATS), default="s16le")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Sliding window length in seconds")
+    parser.add_argument("--every", type=int, default=VERDICT_MS, help="Verdict interval in milliseconds")
+    parser.add_argument("--block-ms", type=int, default=100, help="Read size in milliseconds of audio")
+    parser.add_argument("--listen", metavar="HOST:PORT", help="Accept PCM over TCP instead of stdin")
+    args = parser.parse_args(argv)
+    # Compile the kernels now rather than inside the first verdict
+    warmup(N_FFT, HOP_LENGTH)
+
+    if args.listen:
+        host, _, port = args.listen.rpartition(":")
+        serve(host or "0.0.0.0", int(port), args, sys.stdout)
+        return 0
+
+    blocks = iter_pcm(sys.stdin.buffer, args.channels, args.format, args.block_ms, args.sr)
+    for verdict in detect_stream(blocks, args.sr, window_seconds=args.window, verdict_ms=args.every):
+        print(json.dumps(verdict, ensure_ascii=False), flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
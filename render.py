@@ -0,0 +1,100 @@
+import os
+import struct
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+# matplotlib is imported on first render, for its colormap tables only. The
+# headless backend is selected up front so nothing in this process ever
+# tries to open a display.
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+# On-screen size of the spectrogram image in pixels
+WIDTH = 1000
+HEIGHT = 400
+COLORMAP = "magma"
+TOP_DB = 80.0
+AMIN = 1e-5
+# Flagged time ranges are tinted with this color, and marked by a solid bar
+# of MARK_ROWS along the top edge
+MARK_RGB = (230, 40, 40)
+MARK_ALPHA = 0.45
+MARK_ROWS = 6
+
+# --- SPECTROGRAM IMAGE ---
+# The magnitude STFT is max-pooled to the pixel grid before the dB
+# conversion, so cost and payload no longer grow with clip length. Rows
+# follow a log-frequency axis like specshow(y_axis='log'); max pooling keeps
+# narrow-band peaks and hard cutoffs visible. Colors come from a 256-entry
+# LUT and the PNG is encoded directly, without a matplotlib figure.
+@lru_cache(maxsize=8)
+def colormap_lut(name=COLORMAP):
+    import matplotlib
+
+    rgba = matplotlib.colormaps[name](np.linspace(0, 1, 256))
+    return (rgba[:, :3] * 255).round().astype(np.uint8)
+
+def pool_magnitude(magnitude, width=WIDTH, height=HEIGHT):
+    n_bins, n_frames = magnitude.shape
+
+    # Time: contiguous groups of frames per column
+    if n_frames > width:
+        starts = np.linspace(0, n_frames, width, endpoint=False).astype(np.intp)
+        magnitude = np.maximum.reduceat(magnitude, starts, axis=1)
+
+    # Frequency: log-spaced rows from the first non-DC bin to Nyquist.
+    # Repeated starts (low frequencies, fewer bins than rows) repeat a bin.
+    edges = np.geomspace(1, n_bins, height + 1)[:-1]
+    starts = np.minimum(edges.astype(np.intp), n_bins - 1)
+    return np.maximum.reduceat(magnitude, starts, axis=0)
+
+# librosa.amplitude_to_db(ref=np.max) step for step, so images are unchanged,
+# without loading librosa's scipy-backed modules on the first render
+def amplitude_to_db(magnitude, top_db=TOP_DB):
+    magnitude = np.abs(magnitude)
+    ref_value = np.max(magnitude)
+    power = np.square(magnitude, out=magnitude)
+    D = 10.0 * np.log10(np.maximum(AMIN**2, power))
+    D -= 10.0 * np.log10(np.maximum(AMIN**2, ref_value**2))
+    return np.maximum(D, D.max() - top_db)
+
+def encode_png(rgb):
+    height, width, _ = rgb.shape
+    # Filter type 0 (None) byte before every scanline
+    scanlines = np.empty((height, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 0] = 0
+    scanlines[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", header),
+        chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+        chunk(b"IEND", b""),
+    ])
+
+def mark_ranges(rgb, marks):
+    # marks: (start, end) as fractions of the time axis
+    width = rgb.shape[1]
+    color = np.array(MARK_RGB, dtype=np.float32)
+    for start, end in marks:
+        c0 = int(np.floor(start * width))
+        c1 = max(c0 + 1, int(np.ceil(end * width)))
+        band = rgb[:, c0:c1]
+        band[...] = band * (1 - MARK_ALPHA) + color * MARK_ALPHA
+        band[:MARK_ROWS] = color
+    return rgb
+
+def render_spectrogram_png(magnitude, width=WIDTH, height=HEIGHT, cmap=COLORMAP, marks=()):
+    pooled = pool_magnitude(magnitude, width, height)
+    # Pooling keeps the global maximum, so ref=np.max matches the full matrix
+    D = amplitude_to_db(pooled)
+    index = np.clip((D + TOP_DB) * (255 / TOP_DB), 0, 255).astype(np.uint8)
+    # Row 0 of an image is the top, i.e. the highest frequency
+    rgb = colormap_lut(cmap)[index[::-1]]
+    return encode_png(mark_ranges(rgb, marks) if marks else rgb)
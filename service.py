@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import partial
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from cache import audio_hash
+# analyze is the /analyze handler below
+from forensics import CUTOFF_STRIDE, analyze as analyze_source, detector_version, init_worker
+from instrumentation import METRICS, record_analysis
+from kernels import ACCELERATED
+from spectral import BACKEND_CHOICES, FFT_BACKEND, FFT_WORKERS, make_backend
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Requests allowed to wait for a worker before the service answers 429
+DEFAULT_MAX_QUEUE = 32
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+METRICS.describe("voiceguard_rejected_total", "Requests refused with 429 because the queue was full.")
+METRICS.describe("voiceguard_pool_restarts_total", "Worker pools replaced after a worker died.")
+
+# --- WORKER ---
+def analyze_bytes(data, **options):
+    # Runs in a pool worker; returns plain data only. Hashing a large upload
+    # happens here too, off the event loop.
+    return {"sha256": audio_hash(data), **analyze_source(data, **options)}
+
+# --- ADMISSION CONTROL ---
+# At most `concurrency` analyses run at once and at most `max_queue` more
+# wait for a slot; anything beyond that is refused immediately so clients
+# back off instead of piling up behind a saturated pool. A request takes its
+# place before its body is read, so a burst of uploads cannot all pass the
+# check and then queue past the limit.
+class Admission:
+    def __init__(self, concurrency, max_queue):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def full(self):
+        return self.waiting + self.in_flight >= self.concurrency + self.max_queue
+
+    @asynccontextmanager
+    async def place(self):
+        # Yields a ticket for slot(); the place is given back on exit unless
+        # slot() has already turned it into a running analysis
+        ticket = {"waiting": True}
+        self.waiting += 1
+        try:
+            yield ticket
+        finally:
+            if ticket["waiting"]:
+                self.waiting -= 1
+
+    @asynccontextmanager
+    async def slot(self, ticket):
+        try:
+            await self._slots.acquire()
+        finally:
+            ticket["waiting"] = False
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+# --- WORKER POOL ---
+# A worker that dies (killed for memory, say) breaks the whole
+# ProcessPoolExecutor: every later job fails at once. The first request to
+# see that replaces the pool; the others that were queued on it get a 503.
+def pool_broken(pool):
+    # ProcessPoolExecutor only exposes this as a private flag
+    return bool(getattr(pool, "_broken", False))
+
+def restart_pool(state, broken):
+    if state.pool is broken:
+        METRICS.inc("voiceguard_pool_restarts_total")
+        state.pool_restarts += 1
+        state.pool = state.new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+# --- HANDLERS ---
+class UploadTooLarge(Exception):
+    pass
+
+def capped(request):
+    # The same request, whose body stops with UploadTooLarge once more than
+    # MAX_UPLOAD_BYTES have arrived. Content-Length is only a hint: chunked
+    # and multipart bodies are counted as they are read.
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get("body", b""))
+        if received > MAX_UPLOAD_BYTES:
+            raise UploadTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+async def read_audio(request):
+    request = capped(request)
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        async with request.form(max_files=1) as form:
+            # A text field named "file" is not an upload
+            upload = form.get("file")
+            if not hasattr(upload, "read"):
+                upload = next((v for v in form.values() if hasattr(v, "read")), None)
+            return await upload.read() if upload is not None else b""
+    return await request.body()
+
+async def analyze(request):
+    state = request.app.state
+    if state.admission.full():
+        METRICS.inc("voiceguard_rejected_total")
+        return JSONResponse({"error": "queue full"}, status_code=429, headers={"Retry-After": "1"})
+    async with state.admission.place() as ticket:
+        return await handle_analysis(request, ticket)
+
+async def handle_analysis(request, ticket):
+    state = request.app.state
+    length = request.headers.get("content-length")
+    if length is not None and not length.isdigit():
+        return JSONResponse({"error": "invalid Content-Length"}, status_code=400)
+    if length is not None and int(length) > MAX_UPLOAD_BYTES:
+        return JSONResponse({"error": "upload too large"}, status_code=413)
+    try:
+        data = await read_audio(request)
+    except UploadTooLarge:
+        return JSONResponse({"error": "upload too large"}, status_code=413)
+    if not data:
+        return JSONResponse({"error": "no audio in request body"}, status_code=400)
+
+    streaming = request.query_params.get("streaming") in ("1", "true")
+    channels = request.query_params.get("channels") in ("1", "true")
+    timeline = request.query_params.get("timeline") in ("1", "true")
+    if streaming and (channels or timeline):
+        return JSONResponse({"error": "channels and timeline need the in-memory engine"}, status_code=400)
+    fast = request.query_params.get("fast") in ("1", "true")
+    try:
+        cutoff_stride = int(request.query_params.get("cutoff_stride", CUTOFF_STRIDE))
+    except ValueError:
+        cutoff_stride = 0
+    if cutoff_stride < 1:
+        return JSONResponse({"error": "cutoff_stride must be a positive integer"}, status_code=400)
+
+    loop = asyncio.get_running_loop()
+    async with state.admission.slot(ticket):
+        pool = state.pool
+        try:
+            result = await loop.run_in_executor(pool, partial(
+                analyze_bytes, data, streaming=streaming, fast=fast, cutoff_stride=cutoff_stride,
+                channels=channels, timeline=timeline,
+            ))
+        except BrokenProcessPool:
+            restart_pool(state, pool)
+            return JSONResponse({"error": "analysis worker died; retry"}, status_code=503, headers={"Retry-After": "1"})
+        except Exception as exc:
+            METRICS.inc("voiceguard_analysis_errors_total")
+            return JSONResponse({"error": f"{type(exc).__name__}: {exc}"}, status_code=422)
+
+    record_analysis(result["timings"], result["verdict"])
+    # Lower bounds (fast), estimated cutoffs and per-channel verdicts are
+    # versioned apart from exact whole-file results
+    version = detector_version(fast=fast, channels=channels, cutoff_stride=cutoff_stride)
+    return JSONResponse({**result, "detector_version": version})
+
+async def health(request):
+    state = request.app.state
+    broken = pool_broken(state.pool)
+    return JSONResponse({
+        "status": "degraded" if broken else "ok",
+        "detector_version": state.version,
+        "workers": state.workers,
+        "pool": "broken" if broken else "ok",
+        "pool_restarts": state.pool_restarts,
+        "fft_backend": state.fft_backend,
+        "numba": ACCELERATED,
+        "in_flight": state.admission.in_flight,
+        "queued": state.admission.waiting,
+    }, status_code=503 if broken else 200)
+
+async def metrics(request):
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+def create_app(
+    workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE, concurrency=None,
+    fft_backend=FFT_BACKEND, fft_workers=FFT_WORKERS,
+):
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(fft_backend, fft_workers))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Warm the parent before the pool forks; workers inherit it
+        init_worker(fft_backend, fft_workers)
+        app.state.pool = new_pool()
+        app.state.admission = Admission(concurrency or workers, max_queue)
+        try:
+            yield
+        finally:
+            app.state.pool.shutdown(cancel_futures=True)
+
+    app = Starlette(
+        routes=[
+            Route("/analyze", analyze, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.workers = workers
+    app.state.new_pool = new_pool
+    app.state.pool_restarts = 0
+    # Resolve "auto" here so a missing backend fails at startup, not per request
+    app.state.fft_backend = make_backend(fft_backend, fft_workers).name
+    app.state.version = detector_version()
+    return app
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="VoiceGuard HTTP inference service.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="Analysis worker processes")
+    parser.add_argument("--concurrency", type=int, help="Analyses in flight at once (default: --workers)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Waiting requests before 429")
+    parser.add_argument("--fft-backend", choices=BACKEND_CHOICES, default=FFT_BACKEND)
+    parser.add_argument("--fft-workers", type=int, default=FFT_WORKERS, help="Threads per FFT (-1: all cores)")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.workers, args.max_queue, args.concurrency, args.fft_backend, args.fft_workers)
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
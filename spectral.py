@@ -0,0 +1,144 @@
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Backend for every STFT in the engine: "numpy", "scipy", "pyfftw" or
+# "auto" (pyfftw if installed, else scipy). FFT workers: -1 uses all cores.
+FFT_BACKEND = os.environ.get("VOICEGUARD_FFT_BACKEND", "auto")
+FFT_WORKERS = int(os.environ.get("VOICEGUARD_FFT_WORKERS", "1"))
+
+# Windowed frames per transform block. Small enough that the frames, their
+# spectrum and the window stay in cache between the multiply, FFT and abs.
+BLOCK_BYTES = 1 << 19
+
+# --- WINDOWS AND SCRATCH BUFFERS ---
+# Periodic Hann, computed as scipy.signal.get_window("hann", fftbins=True)
+# does so it is bit-identical to librosa's, without importing scipy.signal
+# (most of a second) on the first transform.
+@lru_cache(maxsize=16)
+def hann_window(n_fft):
+    if n_fft < 2:
+        window = np.ones(n_fft)
+    else:
+        window = 0.5 + 0.5 * np.cos(np.linspace(-np.pi, np.pi, n_fft + 1)[:n_fft])
+    window.flags.writeable = False
+    return window
+
+_scratch = threading.local()
+
+def scratch(name, shape, dtype):
+    # Per-thread buffer reused across calls; grows but never shrinks
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = getattr(_scratch, name, None)
+    if buf is None or buf.nbytes < nbytes:
+        buf = np.empty(nbytes, dtype=np.uint8)
+        setattr(_scratch, name, buf)
+    return buf[:nbytes].view(dtype).reshape(shape)
+
+# --- BACKENDS ---
+# All transform real float64 frames along the last axis. numpy and scipy
+# share pocketfft and give bit-identical results; pyFFTW may differ in the
+# last bits but never enough to move a verdict.
+class NumpyBackend:
+    name = "numpy"
+    workers = 1
+
+    def rfft(self, x):
+        # No out=: it needs NumPy 2, and the result is copied into scratch anyway
+        return np.fft.rfft(x, axis=-1)
+
+class ScipyBackend:
+    name = "scipy"
+
+    def __init__(self, workers=FFT_WORKERS):
+        import scipy.fft
+        self._fft = scipy.fft
+        self.workers = workers
+
+    def rfft(self, x):
+        # x is our own scratch buffer, so it may be clobbered
+        return self._fft.rfft(x, axis=-1, workers=self.workers, overwrite_x=True)
+
+class FFTWBackend:
+    name = "pyfftw"
+
+    def __init__(self, workers=FFT_WORKERS):
+        import pyfftw
+        self._builders = pyfftw.builders
+        self.workers = os.cpu_count() if workers == -1 else workers
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def rfft(self, x):
+        # Plans are built once per block shape in each thread and reused; they
+        # go with their thread, so short-lived threads do not pile them up
+        plans = self._local.__dict__.setdefault("plans", {})
+        plan = plans.get(x.shape)
+        if plan is None:
+            with self._lock:
+                plan = self._builders.rfft(
+                    x.copy(), axis=-1, threads=self.workers, planner_effort="FFTW_MEASURE", avoid_copy=False,
+                )
+            plans[x.shape] = plan
+        return plan(x)
+
+BACKENDS = {"numpy": NumpyBackend, "scipy": ScipyBackend, "pyfftw": FFTWBackend}
+BACKEND_CHOICES = ["auto", *BACKENDS]
+
+def make_backend(name=FFT_BACKEND, workers=FFT_WORKERS):
+    if name == "auto":
+        for candidate in ("pyfftw", "scipy"):
+            try:
+                return make_backend(candidate, workers)
+            except ImportError:
+                continue
+        name = "numpy"
+    if name == "numpy":
+        return NumpyBackend()
+    return BACKENDS[name](workers)
+
+_backend = None
+
+def get_backend():
+    # Chosen once per process, on first use or via set_backend at startup
+    global _backend
+    if _backend is None:
+        _backend = make_backend()
+    return _backend
+
+def set_backend(name, workers=FFT_WORKERS):
+    global _backend
+    _backend = make_backend(name, workers)
+    return _backend
+
+# --- STFT MAGNITUDE ---
+# |librosa.stft(y)| for the default Hann window, as float32 with shape
+# (..., 1 + n_fft // 2, frames). Frames are windowed into a reused scratch
+# buffer laid out frame-major so each FFT runs over contiguous memory. The
+# spectrum is rounded to complex64 before abs(), as librosa does, so the
+# magnitudes are bit-identical to the librosa path.
+def stft_magnitude(y, n_fft, hop_length, center=True, backend=None):
+    backend = backend or get_backend()
+    if center:
+        y = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(n_fft // 2, n_fft // 2)])
+    frames = sliding_window_view(y, n_fft, axis=-1)[..., ::hop_length, :]
+    lead = frames.shape[:-2]
+    n_frames = frames.shape[-2]
+    # Fortran order like librosa, so later reductions sum in the same order
+    # and each block's frame-major spectrum lands in contiguous memory
+    out = np.empty(lead + (1 + n_fft // 2, n_frames), dtype=np.float32, order="F")
+
+    window = hann_window(n_fft)
+    step = max(1, BLOCK_BYTES // (int(np.prod(lead, dtype=np.int64)) * n_fft * 8))
+    for start in range(0, n_frames, step):
+        stop = min(start + step, n_frames)
+        x = scratch("frames", lead + (stop - start, n_fft), np.float64)
+        np.multiply(frames[..., start:stop, :], window, out=x)
+        spectrum = scratch("spectrum64", x.shape[:-1] + (1 + n_fft // 2,), np.complex64)
+        spectrum[...] = backend.rfft(x)
+        np.abs(spectrum, out=out[..., start:stop].swapaxes(-1, -2))
+    return out
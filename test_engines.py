@@ -0,0 +1,124 @@
+import io
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+from scipy import signal
+
+import kernels
+from bench import synthesize
+from forensics import (
+    HOP_LENGTH, N_FFT, ZC_THRESHOLD, analyze_audio_forensics, analyze_audio_forensics_streaming, analyze_batch,
+    analyze_channels, frame_features,
+)
+from spectral import make_backend, stft_magnitude
+
+# --- SYNTHESIZED CLIPS ---
+# bench.py's signals plus low-passed noise, which only the cutoff flags
+KINDS = ["tone", "noise", "speech", "padded", "lowpass"]
+RATES = [16000, 44100]
+
+def clip(kind, sr, duration=3.0, seed=0):
+    if kind == "lowpass":
+        sos = signal.butter(8, 6000, fs=sr, output="sos")
+        return signal.sosfilt(sos, clip("noise", sr, duration, seed)).astype(np.float32)
+    return np.concatenate(list(synthesize(kind, sr, duration, seed)))
+
+def wav_bytes(y, sr):
+    # Float WAV, so every engine decodes exactly the samples given
+    buf = io.BytesIO()
+    sf.write(buf, y.T, sr, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+# --- ENGINE EQUIVALENCE ---
+@pytest.mark.parametrize("sr", RATES)
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("block_frames", [1, 256])
+def test_streaming_matches_in_memory(kind, sr, block_frames):
+    data = wav_bytes(clip(kind, sr), sr)
+    score, evidence, _ = analyze_audio_forensics(data)
+    assert analyze_audio_forensics_streaming(data, block_frames=block_frames)[:2] == (score, evidence)
+
+@pytest.mark.parametrize("sr", RATES)
+def test_batch_matches_scalar(sr):
+    # Mixed lengths, so clips share a padded bucket
+    clips = [clip(kind, sr, duration, seed) for seed, kind in enumerate(KINDS) for duration in (1.0, 1.3, 2.0)]
+    expected = [analyze_audio_forensics(wav_bytes(y, sr))[:2] for y in clips]
+    assert analyze_batch(clips, sr) == expected
+
+def test_channels_match_mono():
+    sr = 16000
+    y = np.stack([clip("speech", sr), clip("lowpass", sr)])
+    score, _, channel_set = analyze_channels(wav_bytes(y, sr))
+    expected = [analyze_audio_forensics(wav_bytes(channel, sr))[:2] for channel in y]
+    assert channel_set.results == expected
+    assert score == max(s for s, _ in expected)
+
+def test_silent_channel_left_out():
+    sr = 44100
+    y = np.stack([clip("noise", sr), np.zeros(3 * sr, dtype=np.float32)])
+    score, _, channel_set = analyze_channels(wav_bytes(y, sr))
+    assert score == 0
+    assert channel_set.results[1][0] is None
+
+def test_empty_recording_rejected():
+    data = wav_bytes(np.zeros(0, dtype=np.float32), 16000)
+    for engine in (analyze_audio_forensics, analyze_audio_forensics_streaming, analyze_channels):
+        with pytest.raises(ValueError, match="no audio samples"):
+            engine(data)
+
+# --- FEATURES AGAINST LIBROSA ---
+@pytest.mark.parametrize("sr", RATES)
+@pytest.mark.parametrize("kind", KINDS)
+def test_frame_features_match_librosa(kind, sr):
+    y = clip(kind, sr)
+    rms, zc_count = frame_features(y, N_FFT, HOP_LENGTH)
+    expected = librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)[0]
+    np.testing.assert_allclose(rms, expected, rtol=1e-5, atol=1e-9)
+    assert zc_count.sum() == librosa.zero_crossings(y, threshold=ZC_THRESHOLD, pad=False).sum()
+
+@pytest.mark.parametrize("backend", ["numpy", "scipy"])
+@pytest.mark.parametrize("center", [True, False])
+def test_stft_matches_librosa(backend, center):
+    y = clip("speech", 44100, 2.0)
+    expected = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=center))
+    magnitude = stft_magnitude(y, N_FFT, HOP_LENGTH, center=center, backend=make_backend(backend))
+    assert np.array_equal(magnitude, expected)
+
+# --- NUMBA KERNELS ---
+def test_numba_kernels_match_numpy():
+    numba = pytest.importorskip("numba")
+    jit = numba.njit
+    rng = np.random.default_rng(0)
+    chunk = (0.1 * rng.standard_normal(7 * HOP_LENGTH + N_FFT)).astype(np.float32)
+    chunk[:N_FFT] = 0.0
+
+    for last_negative in (-1, 0, 1):
+        expected = kernels._crossing_count_numpy(chunk, last_negative, ZC_THRESHOLD)
+        assert jit(kernels._crossing_count_loop)(chunk, last_negative, ZC_THRESHOLD) == expected
+    np.testing.assert_allclose(
+        jit(kernels._min_frame_rms_loop)(chunk, N_FFT, HOP_LENGTH),
+        kernels._min_frame_rms_numpy(chunk, N_FFT, HOP_LENGTH), rtol=1e-5,
+    )
+    np.testing.assert_allclose(
+        jit(kernels._frame_rms_values_loop)(chunk, N_FFT, HOP_LENGTH),
+        kernels._frame_rms_values_numpy(chunk, N_FFT, HOP_LENGTH), rtol=1e-5,
+    )
+
+    magnitude = stft_magnitude(chunk, N_FFT, HOP_LENGTH, center=False)
+    energy = np.zeros(magnitude.shape[0])
+    expected = energy.copy()
+    jit(kernels._add_frame_sums_loop)(energy, magnitude)
+    kernels._add_frame_sums_numpy(expected, magnitude)
+    np.testing.assert_allclose(energy, expected, rtol=1e-6)
+
+    # Enough frames to wrap a three-slot ring twice
+    rings = [np.zeros((3, magnitude.shape[0])) for _ in range(2)]
+    energies = [np.zeros(magnitude.shape[0]) for _ in range(2)]
+    pos = [0, 0]
+    for update, i in ((jit(kernels._ring_update_loop), 0), (kernels._ring_update_numpy, 1)):
+        pos[i] = update(rings[i], energies[i], magnitude.T, pos[i])
+    assert pos[0] == pos[1]
+    np.testing.assert_array_equal(rings[0], rings[1])
+    np.testing.assert_allclose(energies[0], energies[1], rtol=1e-9)
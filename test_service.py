@@ -0,0 +1,80 @@
+import asyncio
+import io
+
+import httpx
+import numpy as np
+import pytest
+import soundfile as sf
+from starlette.testclient import TestClient
+
+import service
+from forensics import detector_version
+
+def noise_wav(seconds=1.0, sr=44100):
+    y = 0.1 * np.random.default_rng(0).standard_normal(int(seconds * sr))
+    buf = io.BytesIO()
+    sf.write(buf, y.astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(service.create_app(workers=1)) as client:
+        yield client
+
+def test_analyze(client):
+    response = client.post("/analyze", content=noise_wav())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["verdict"] == "HUMAN"
+    assert body["detector_version"] == detector_version()
+
+def test_multipart_upload(client):
+    response = client.post("/analyze", files={"file": ("clip.wav", noise_wav(), "audio/wav")})
+    assert response.status_code == 200
+
+def test_options_change_version(client):
+    body = client.post("/analyze?fast=1", content=noise_wav()).json()
+    assert body["detector_version"] == detector_version(fast=True) != detector_version()
+
+@pytest.mark.parametrize("query, content, headers", [
+    ("", b"", {}),
+    ("", noise_wav(), {"content-length": "abc"}),
+    ("?cutoff_stride=0", noise_wav(), {}),
+    ("?streaming=1&channels=1", noise_wav(), {}),
+])
+def test_bad_request(client, query, content, headers):
+    assert client.post(f"/analyze{query}", content=content, headers=headers).status_code == 400
+
+def test_upload_too_large(client, monkeypatch):
+    monkeypatch.setattr(service, "MAX_UPLOAD_BYTES", 1000)
+    data = noise_wav()
+
+    def chunks():
+        for start in range(0, len(data), 4096):
+            yield data[start:start + 4096]
+
+    assert client.post("/analyze", content=data).status_code == 413
+    # Chunked and multipart bodies carry no usable Content-Length
+    assert client.post("/analyze", content=chunks()).status_code == 413
+    assert client.post("/analyze", files={"file": ("clip.wav", data)}).status_code == 413
+
+def test_queue_full():
+    # One analysis at a time and one waiting: of four slow uploads arriving
+    # together, two hold places while their bodies trickle in
+    app = service.create_app(workers=1, max_queue=1, concurrency=1)
+    data = noise_wav()
+
+    async def slow_body():
+        for start in range(0, len(data), len(data) // 4):
+            await asyncio.sleep(0.1)
+            yield data[start:start + len(data) // 4]
+
+    async def burst():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+                return await asyncio.gather(*[client.post("/analyze", content=slow_body()) for _ in range(4)])
+
+    responses = asyncio.run(burst())
+    assert sorted(r.status_code for r in responses) == [200, 200, 429, 429]
+    assert all(r.headers["retry-after"] == "1" for r in responses if r.status_code == 429)